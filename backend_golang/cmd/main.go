@@ -7,10 +7,13 @@ import (
 	"net/http"
 	"os"
 	"os/exec"
+	"os/signal"
+	"syscall"
 
 	"api/database"
 	"api/handlers"
 	"api/middleware"
+	"api/utils"
 )
 
 const PORT = ":5050"
@@ -23,6 +26,17 @@ func main() {
 	// Chargement éventuel des modèles Python
 	initPythonModels()
 
+	// Démon Python du pipeline : modèles chargés une fois pour toutes les requêtes
+	stopPipeline := utils.StartPipelineDaemon()
+	go func() {
+		signals := make(chan os.Signal, 1)
+		signal.Notify(signals, os.Interrupt, syscall.SIGTERM)
+		<-signals
+		stopPipeline()
+		database.DB.Close()
+		os.Exit(0)
+	}()
+
 	// Initialisation du routeur
 	router := setupRoutes()
 
@@ -56,25 +56,13 @@ func HandlerNewAudio(db *sql.DB) http.HandlerFunc {
 		// 🧠 Créer le nom de base : ./static/file/user_<id>/<uuid>/
 		fileBase := fmt.Sprintf("./static/file/user_%d/%s", userID, audioUUID)
 
-		// 🧠 Transcription
-		if !utils.Transcription(audioUUID + "." + strings.TrimPrefix(audioExt, ".")) {
-			utils.RespondWithMessage(w, http.StatusInternalServerError, "Transcription failed")
+		// 🧠 Transcription → 📝 Résumé → 🔊 Résumé audio (un seul appel au pipeline Python)
+		if !utils.RunPipeline(audioUUID, strings.TrimPrefix(audioExt, ".")) {
+			utils.RespondWithMessage(w, http.StatusInternalServerError, "Audio processing failed")
 			return
 		}
 		transPath := filepath.Join(fileBase, "transcription.txt")
-
-		// 📝 Résumé
-		if !utils.Resume(audioUUID) {
-			utils.RespondWithMessage(w, http.StatusInternalServerError, "Résumé failed")
-			return
-		}
 		summaryPath := filepath.Join(fileBase, "resum.txt")
-
-		// 🔊 Génération du résumé audio
-		if !utils.GenerateResumeAudio(audioUUID) {
-			utils.RespondWithMessage(w, http.StatusInternalServerError, "Audio résumé generation failed")
-			return
-		}
 		audioOutPath := filepath.Join(fileBase, "audio_resume.mp3")
 
 		// 💾 Enregistrement dans la base
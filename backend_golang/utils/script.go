@@ -4,59 +4,82 @@ import (
 	"fmt"
 	"os"
 	"os/exec"
+	"sync"
+	"time"
 )
 
-// Transcription appelle le script Python pour générer la transcription.
-func Transcription(uuid string) bool {
-	pythonEnv := "./speech_to_text/venv/bin/python3"
-	scriptPath := "./speech_to_text/transcription.py"
+const (
+	pipelinePython = "./speech_to_text/venv/bin/python3"
+	pipelineScript = "./speech_to_text/pipeline.py"
+	// Délai avant de relancer le démon s'il s'arrête
+	pipelineRestartDelay = 5 * time.Second
+)
 
-	args := []string{scriptPath, uuid}
-	cmd := exec.Command(pythonEnv, args...)
+// RunPipeline envoie la transcription, le résumé et la synthèse vocale au démon
+// Python (pipeline.py) : un seul interpréteur, modèles déjà chargés.
+func RunPipeline(uuid string, ext string) bool {
+	args := []string{pipelineScript, uuid, ext}
+	cmd := exec.Command(pipelinePython, args...)
 
-	// Pour debug en local
 	cmd.Stdout = os.Stdout
 	cmd.Stderr = os.Stderr
 
 	if err := cmd.Run(); err != nil {
-		fmt.Printf("❌ Transcription error: %v\n", err)
+		fmt.Printf("❌ Pipeline error: %v\n", err)
 		return false
 	}
 	return true
 }
 
-// Resume appelle le script Python qui résume la transcription.
-func Resume(uuid string) bool {
-	pythonEnv := "./speech_to_text/venv/bin/python3"
-	scriptPath := "./speech_to_text/resume.py"
+// StartPipelineDaemon lance "pipeline.py serve" (Whisper, Spacy et TTS chargés une
+// seule fois) et le relance s'il s'arrête. La fonction retournée l'arrête.
+func StartPipelineDaemon() (stop func()) {
+	var (
+		mu      sync.Mutex
+		current *exec.Cmd
+		stopped bool
+	)
 
-	args := []string{scriptPath, uuid}
-	cmd := exec.Command(pythonEnv, args...)
+	go func() {
+		for {
+			cmd := exec.Command(pipelinePython, pipelineScript, "serve")
+			cmd.Stdout = os.Stdout
+			cmd.Stderr = os.Stderr
 
-	cmd.Stdout = os.Stdout
-	cmd.Stderr = os.Stderr
+			mu.Lock()
+			if stopped {
+				mu.Unlock()
+				return
+			}
+			err := cmd.Start()
+			if err == nil {
+				current = cmd
+			}
+			mu.Unlock()
 
-	if err := cmd.Run(); err != nil {
-		fmt.Printf("❌ Résumé error: %v\n", err)
-		return false
-	}
-	return true
-}
+			if err == nil {
+				fmt.Printf("🟢 Démon du pipeline démarré (pid %d)\n", cmd.Process.Pid)
+				err = cmd.Wait()
+			}
 
-// GenerateResumeAudio appelle le script Python qui synthétise le résumé.
-func GenerateResumeAudio(uuid string) bool {
-	pythonEnv := "./speech_to_text/venv310/bin/python3"
-	scriptPath := "./speech_to_text/text_to_speech.py"
+			mu.Lock()
+			current = nil
+			done := stopped
+			mu.Unlock()
+			if done {
+				return
+			}
+			fmt.Printf("⚠️ Démon du pipeline arrêté (%v), relance dans %s\n", err, pipelineRestartDelay)
+			time.Sleep(pipelineRestartDelay)
+		}
+	}()
 
-	args := []string{scriptPath, uuid}
-	cmd := exec.Command(pythonEnv, args...)
-
-	cmd.Stdout = os.Stdout
-	cmd.Stderr = os.Stderr
-
-	if err := cmd.Run(); err != nil {
-		fmt.Printf("❌ Audio résumé error: %v\n", err)
-		return false
+	return func() {
+		mu.Lock()
+		defer mu.Unlock()
+		stopped = true
+		if current != nil && current.Process != nil {
+			current.Process.Signal(os.Interrupt)
+		}
 	}
-	return true
 }
@@ -0,0 +1,82 @@
+import os
+import logging
+import numpy as np
+from typing import Dict, Any
+from download_models import WHISPER_MODEL_SIZE
+from model_registry import registry, PRELOAD_MODEL_SIZES
+
+# Moteur de reconnaissance vocale utilisé par transcription.py
+ASR_BACKEND = os.getenv("ASR_BACKEND", "whisper")
+
+# Logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+class ASRBackend:
+    """Interface commune des moteurs : transcribe() retourne {"text", "segments": [{start, end, text}]}."""
+    name = ""
+
+    def model_key(self, model_size: str) -> str:
+        """Clé du modèle dans le registre (et dans la clé du cache des transcriptions)."""
+        raise NotImplementedError
+
+    def load(self, model_size: str = WHISPER_MODEL_SIZE):
+        """Retourne le modèle (chargé une seule fois) et le verrou à tenir pendant son utilisation."""
+        return registry.get(self.model_key(model_size))
+
+    def is_loaded(self, model_size: str = WHISPER_MODEL_SIZE) -> bool:
+        return registry.is_resident(self.model_key(model_size))
+
+    def transcribe(self, audio: np.ndarray, model_size: str = WHISPER_MODEL_SIZE,
+                   language: str = "fr", **options) -> Dict[str, Any]:
+        raise NotImplementedError
+
+class WhisperBackend(ASRBackend):
+    """openai-whisper en float32."""
+    name = "whisper"
+
+    def model_key(self, model_size: str) -> str:
+        return model_size
+
+    def transcribe(self, audio: np.ndarray, model_size: str = WHISPER_MODEL_SIZE,
+                   language: str = "fr", **options) -> Dict[str, Any]:
+        model, model_lock = self.load(model_size)
+        with model_lock:
+            result = model.transcribe(audio, language=language, **options)
+        return {
+            "text": result["text"],
+            "segments": [
+                {"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+                for seg in result.get("segments", [])
+            ],
+        }
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """Même checkpoint Whisper, couches linéaires quantifiées en int8 (CPU uniquement)."""
+    name = "whisper-int8"
+
+    def model_key(self, model_size: str) -> str:
+        return f"{model_size}:int8"
+
+    def transcribe(self, audio: np.ndarray, model_size: str = WHISPER_MODEL_SIZE,
+                   language: str = "fr", **options) -> Dict[str, Any]:
+        return super().transcribe(audio, model_size, language, fp16=False, **options)
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend(), QuantizedWhisperBackend())}
+
+def get_backend(name: str = ASR_BACKEND) -> ASRBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"❌ Moteur ASR inconnu : {name} (disponibles : {', '.join(BACKENDS)})")
+    return BACKENDS[name]
+
+def preloaded(name: str = ASR_BACKEND) -> bool:
+    """Vrai quand tous les modèles préchargés au démarrage sont résidents (aucun chargement)."""
+    backend = get_backend(name)
+    return all(registry.is_resident(backend.model_key(size)) for size in PRELOAD_MODEL_SIZES)
+
+def preload(name: str = ASR_BACKEND):
+    """Charge au démarrage les modèles configurés pour le moteur choisi."""
+    backend = get_backend(name)
+    registry.preload([backend.model_key(size) for size in PRELOAD_MODEL_SIZES])
@@ -0,0 +1,96 @@
+import numpy as np
+
+# Analyse énergétique sur des trames de 30 ms (16 kHz)
+FRAME_SIZE = 480
+
+def frame_energy(audio: np.ndarray, frame_size: int = FRAME_SIZE) -> np.ndarray:
+    """Énergie RMS de chaque trame, calculée de façon vectorisée."""
+    n_frames = len(audio) // frame_size
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:n_frames * frame_size].reshape(n_frames, frame_size)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+def quietest_point(audio: np.ndarray, lo: int, hi: int, frame_size: int = FRAME_SIZE) -> int:
+    """Indice d'échantillon (début de trame) le moins énergétique entre lo et hi."""
+    lo_frame, hi_frame = lo // frame_size, max(lo // frame_size + 1, hi // frame_size)
+    energy = frame_energy(audio[lo_frame * frame_size:hi_frame * frame_size], frame_size)
+    if len(energy) == 0:
+        return hi
+    return (lo_frame + int(np.argmin(energy))) * frame_size
+
+def find_silence_splits(audio: np.ndarray, n_parts: int, search_frames: int = 100,
+                        frame_size: int = FRAME_SIZE) -> list[int]:
+    """Retourne les indices d'échantillons où couper l'audio en n_parts, au plus près d'un silence."""
+    energy = frame_energy(audio, frame_size)
+    if n_parts <= 1 or len(energy) < n_parts:
+        return []
+
+    splits = []
+    for k in range(1, n_parts):
+        target = k * len(energy) // n_parts
+        lo = max(target - search_frames, 1)
+        hi = min(target + search_frames, len(energy) - 1)
+        # La trame la moins énergétique autour de la cible idéale
+        quietest = lo + int(np.argmin(energy[lo:hi]))
+        splits.append(quietest * frame_size)
+
+    return sorted(set(splits))
+
+# Détection de parole par énergie (VAD)
+# Seuil relatif au niveau de l'enregistrement lui-même : une prise de son faible reste détectée
+VAD_RELATIVE_THRESHOLD = 0.05  # ~ -26 dB sous le niveau des passages les plus forts
+VAD_MIN_RMS = 1e-4             # ~ -80 dBFS : silence numérique uniquement
+VAD_MIN_SILENCE_SECONDS = 1.0  # Les pauses plus courtes restent dans le segment de parole
+VAD_PADDING_SECONDS = 0.2      # Marge conservée autour de chaque segment de parole
+
+def speech_spans(audio: np.ndarray, sample_rate: int = 16000, frame_size: int = FRAME_SIZE,
+                 min_silence_seconds: float = VAD_MIN_SILENCE_SECONDS,
+                 padding_seconds: float = VAD_PADDING_SECONDS) -> list[tuple[int, int]]:
+    """Intervalles (début, fin) en échantillons contenant de la parole, calculés sans boucle Python."""
+    energy = frame_energy(audio, frame_size)
+    if len(energy) == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    threshold = max(VAD_MIN_RMS, VAD_RELATIVE_THRESHOLD * float(np.percentile(energy, 95)))
+    voiced = np.concatenate(([0], (energy > threshold).astype(np.int8), [0]))
+    edges = np.diff(voiced)
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return []
+
+    # Fusion des segments séparés par une pause trop courte
+    frame_seconds = frame_size / sample_rate
+    keep = (starts[1:] - ends[:-1]) * frame_seconds >= min_silence_seconds
+    starts, ends = starts[np.r_[True, keep]], ends[np.r_[keep, True]]
+
+    padding = int(padding_seconds * sample_rate)
+    starts = np.maximum(starts * frame_size - padding, 0)
+    ends = np.minimum(ends * frame_size + padding, len(audio))
+    # La dernière trame incomplète suit la trame qui la précède
+    if ends[-1] >= (len(energy) * frame_size):
+        ends[-1] = len(audio)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def compact_speech(audio: np.ndarray, spans: list[tuple[int, int]]) -> tuple[np.ndarray, list[tuple[int, int]]]:
+    """Concatène les segments de parole ; retourne l'audio réduit et la table (début réduit, début original)."""
+    timeline, position = [], 0
+    for start, end in spans:
+        timeline.append((position, start))
+        position += end - start
+    if not spans:
+        return audio[:0], timeline
+    return np.concatenate([audio[start:end] for start, end in spans]), timeline
+
+def to_original_time(seconds: float, timeline: list[tuple[int, int]], sample_rate: int = 16000,
+                     is_end: bool = False) -> float:
+    """Convertit un instant de l'audio réduit en instant de l'audio original.
+
+    Une fin de segment tombant pile sur une jonction reste rattachée au segment de parole précédent.
+    """
+    sample = int(round(seconds * sample_rate))
+    # Dernier segment de parole commençant avant l'instant demandé
+    side = "left" if is_end else "right"
+    index = max(0, int(np.searchsorted([compact for compact, _ in timeline], sample, side=side)) - 1)
+    compact_start, original_start = timeline[index]
+    return (original_start + sample - compact_start) / sample_rate
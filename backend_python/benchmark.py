@@ -0,0 +1,402 @@
+import os
+import sys
+import json
+import time
+import re
+import random
+import logging
+import argparse
+import resource
+import tempfile
+import wave
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any
+
+# Benchmarks de chaque étape du pipeline, exécutables hors ligne sur CPU :
+#   python benchmark.py --sizes 1,10,60 --save           : mesure et enregistre une référence
+#   python benchmark.py --compare benchmarks/abc1234.json : compare à une référence
+#   python benchmark.py --asr benchmarks/asr_samples      : compare les moteurs ASR (vitesse, mémoire, WER)
+# Chaque (étape, taille) tourne dans un processus neuf pour mesurer son pic de RSS.
+
+BASELINE_DIR = "benchmarks"
+SAMPLE_RATE = 16000
+WORDS_PER_MINUTE = 150
+STAGES = ["decode", "convert_to_wav", "transcribe", "tokenize", "summarize", "normalize", "tts"]
+AUDIO_STAGES = {"decode", "convert_to_wav", "transcribe"}
+ASR_BACKENDS = ["whisper", "whisper-int8"]
+
+# Jeu d'échantillons fixe pour comparer les moteurs ASR (généré une fois avec --make-asr-samples)
+ASR_SAMPLE_SENTENCES = [
+    "Bonjour à tous, merci d'être présents pour cette réunion de lancement du projet.",
+    "Le budget prévu pour le deuxième trimestre s'élève à deux cent cinquante mille euros.",
+    "Nous devons valider le calendrier avec le client avant la fin de la semaine prochaine.",
+    "L'équipe de développement propose de livrer une première version au mois de mars.",
+    "Les résultats de l'analyse de marché confirment l'intérêt pour ce nouveau service.",
+    "Pouvez-vous envoyer le compte rendu de la réunion à l'ensemble des participants ?",
+    "La décision finale sera prise lors du prochain comité de direction, le douze avril.",
+    "Il faut encore vérifier la qualité des données avant la mise en production.",
+]
+
+FRENCH_WORDS = (
+    "le la les un une des de du et à en pour dans sur avec par que qui ne pas plus "
+    "réunion projet équipe budget client rapport semaine mois année résultat objectif "
+    "décision question réponse production service données analyse marché développement "
+    "présente propose explique confirme souhaite prévoit valide rappelle demande "
+    "important nouveau prochain premier dernier rapide complet principal commercial"
+).split()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+def synthetic_text(minutes: float, seed: int = 0) -> str:
+    """Texte français factice d'une longueur équivalente à `minutes` de parole."""
+    rng = random.Random(seed)
+    sentences = []
+    n_words = 0
+    while n_words < minutes * WORDS_PER_MINUTE:
+        length = rng.randint(8, 20)
+        words = [rng.choice(FRENCH_WORDS) for _ in range(length)]
+        if rng.random() < 0.2:
+            words.insert(rng.randint(0, length), str(rng.choice([3, 12, 250, 1999, 2024, 12500])))
+        sentences.append(" ".join(words).capitalize() + rng.choice([".", ".", ".", " ?", ","]))
+        n_words += length
+    return " ".join(sentences)
+
+def synthetic_audio(minutes: float, path: str, seed: int = 0):
+    """Signal proche de la parole (harmoniques modulées en syllabes, pauses) encodé en MP3."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(minutes * 60 * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    # Pauses d'environ 1 s toutes les 8 s
+    pauses = (t % 8) < 7
+    audio = 0.2 * voice * syllables * pauses + 0.01 * rng.standard_normal(len(t))
+    subprocess.run(
+        ["ffmpeg", "-nostdin", "-y", "-loglevel", "error", "-f", "f32le", "-ar", str(SAMPLE_RATE), "-ac", "1",
+         "-i", "pipe:", "-b:a", "64k", path],
+        input=audio.astype(np.float32).tobytes(), check=True,
+    )
+
+class StubWhisperModel:
+    """Remplaçant de Whisper : calcul FFT proportionnel à la durée, segments toutes les 5 s."""
+
+    def transcribe(self, audio, language=None, initial_prompt=None, **options):
+        import numpy as np
+
+        frames = len(audio) // 400
+        spectrum = np.abs(np.fft.rfft(audio[:frames * 400].reshape(frames, 400), axis=1)) if frames else []
+        duration = len(audio) / SAMPLE_RATE
+        segments = [
+            {"start": start, "end": min(start + 5.0, duration), "text": synthetic_text(5 / 60, seed=int(start))}
+            for start in np.arange(0, duration, 5.0)
+        ]
+        return {"text": " ".join(s["text"] for s in segments), "segments": segments, "energy": float(np.sum(spectrum))}
+
+def _percentiles(values: list[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+def _prepare(stage: str, minutes: float, workdir: str, options: Dict[str, Any]):
+    """Prépare l'étape et retourne (fonction à mesurer, quantité traitée, unité)."""
+    if stage in AUDIO_STAGES:
+        # Fichier généré par run_stages : sa création ne compte pas dans le pic de RSS mesuré
+        audio_path = _audio_input_path(workdir, minutes)
+        seconds = minutes * 60
+
+        if stage == "decode":
+            from transcription import decode_audio
+            return (lambda: decode_audio(audio_path)), seconds, "s audio"
+        if stage == "convert_to_wav":
+            from transcription import convert_to_wav
+            wav_path = os.path.join(workdir, "bench.wav")
+            return (lambda: convert_to_wav(audio_path, wav_path)), seconds, "s audio"
+
+        from transcription import transcribe_file
+        from model_registry import registry
+        size = options["whisper"]
+        if size == "stub":
+            registry.register("stub", StubWhisperModel())
+        return (lambda: transcribe_file(audio_path, size)), seconds, "s audio"
+
+    text = synthetic_text(minutes)
+    n_words = len(text.split())
+
+    if stage in ("tokenize", "summarize"):
+        # Spacy est chargé au premier usage : le charger ici pour qu'une installation incomplète saute l'étape
+        from resume import get_nlp
+        get_nlp()
+    if stage == "tokenize":
+        from resume import tokenize, split_text
+        return (lambda: split_text(text, tokenize(text))), n_words, "mots"
+    if stage == "summarize":
+        from resume import generate_summary
+        return (lambda: generate_summary(text)), n_words, "mots"
+
+    # Les étapes TTS travaillent sur un résumé (~25 % du texte)
+    summary = " ".join(text.split()[:max(1, n_words // 4)])
+    if stage == "normalize":
+        from text_normalizer import normalize_text
+        return (lambda: normalize_text(summary)), len(summary), "caractères"
+
+    from text_to_speech import generate_tts_audio
+    if options["tts"] == "stub":
+        import tts_engine
+        tts_engine.set_engine(_stub_tts_engine())
+    output_path = os.path.join(workdir, "bench_tts.mp3")
+    return (lambda: generate_tts_audio(summary, output_path)), len(summary), "caractères"
+
+def _audio_input_path(workdir: str, minutes: float) -> str:
+    return os.path.join(workdir, f"bench_{minutes}min.mp3")
+
+def _stub_tts_engine():
+    import numpy as np
+    from tts_engine import TTSEngine
+
+    class StubTTSEngine(TTSEngine):
+        """Remplaçant du modèle VITS : ~60 ms de signal par caractère."""
+        sample_rate = 22050
+
+        def load(self):
+            return self
+
+        def synthesize(self, text: str):
+            t = np.arange(int(len(text) * 0.06 * self.sample_rate)) / self.sample_rate
+            return (0.1 * np.sin(2 * np.pi * 180 * t)).astype(np.float32)
+
+    return StubTTSEngine()
+
+def run_stage(stage: str, minutes: float, repeats: int, workdir: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Exécuté dans un processus dédié : préparation, préchauffage puis mesures."""
+    # Caches désactivés (budget nul) pour mesurer le vrai coût de chaque étape
+    os.environ.setdefault("TRANSCRIPTION_CACHE_MAX_BYTES", "0")
+    os.environ.setdefault("SUMMARY_CACHE_MAX_BYTES", "0")
+    os.environ.setdefault("WHISPER_PRELOAD_SIZES", options["whisper"])
+    if options.get("ollama_url"):
+        os.environ["OLLAMA_BASE_URL"] = options["ollama_url"]
+    logging.getLogger().setLevel(logging.WARNING)
+
+    try:
+        func, amount, unit = _prepare(stage, minutes, workdir, options)
+    except (ImportError, OSError, RuntimeError, SystemExit) as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+
+    func()  # Préchauffage (chargement des modèles, caches internes)
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+
+    stats = _percentiles(latencies)
+    return {
+        **stats,
+        "throughput": amount / stats["p50"] if stats["p50"] else None,
+        "unit": f"{unit}/s",
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "repeats": repeats,
+    }
+
+def normalize_words(text: str) -> list[str]:
+    return re.findall(r"\w+(?:['’]\w+)*", text.lower())
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER = (substitutions + suppressions + insertions) / nombre de mots de la référence."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+def load_asr_samples(directory: str) -> list[tuple[str, str]]:
+    """Paires (fichier audio, transcription de référence) : sample.wav + sample.txt."""
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        base, ext = os.path.splitext(name)
+        reference_path = os.path.join(directory, base + ".txt")
+        if ext.lower() in (".wav", ".mp3", ".flac", ".ogg", ".m4a") and os.path.isfile(reference_path):
+            with open(reference_path, "r", encoding="utf-8") as f:
+                samples.append((os.path.join(directory, name), f.read().strip()))
+    return samples
+
+def make_asr_samples(directory: str):
+    """Génère le jeu d'échantillons fixe avec le modèle TTS local (aucun accès réseau)."""
+    import numpy as np
+    from tts_engine import get_engine
+
+    engine = get_engine().load()
+    os.makedirs(directory, exist_ok=True)
+    for index, sentence in enumerate(ASR_SAMPLE_SENTENCES):
+        base = os.path.join(directory, f"sample_{index:02d}")
+        samples = np.clip(engine.synthesize(sentence), -1, 1)
+        with wave.open(base + ".wav", "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(engine.sample_rate)
+            f.writeframes((samples * 32767).astype(np.int16).tobytes())
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(sentence)
+    logging.info(f"💾 {len(ASR_SAMPLE_SENTENCES)} échantillons écrits dans {directory}")
+
+def run_asr_backend(backend_name: str, model_size: str, samples: list[tuple[str, str]]) -> Dict[str, Any]:
+    """Exécuté dans un processus dédié : chargement du moteur puis transcription de chaque échantillon."""
+    logging.getLogger().setLevel(logging.WARNING)
+    from asr_backends import get_backend
+    from transcription import decode_audio, TRANSCRIPTION_LANGUAGE
+
+    backend = get_backend(backend_name)
+    if model_size == "stub":
+        from model_registry import registry
+        registry.register(backend.model_key("stub"), StubWhisperModel())
+    try:
+        start = time.perf_counter()
+        backend.load(model_size)
+        load_seconds = time.perf_counter() - start
+    except (ImportError, OSError) as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+
+    audios = [(decode_audio(path), reference) for path, reference in samples]
+    backend.transcribe(audios[0][0], model_size, language=TRANSCRIPTION_LANGUAGE)  # Préchauffage
+
+    latencies, errors, audio_seconds = [], [], 0.0
+    for audio, reference in audios:
+        start = time.perf_counter()
+        result = backend.transcribe(audio, model_size, language=TRANSCRIPTION_LANGUAGE)
+        latencies.append(time.perf_counter() - start)
+        errors.append(word_error_rate(reference, result["text"]))
+        audio_seconds += len(audio) / SAMPLE_RATE
+
+    return {
+        **_percentiles(latencies),
+        "throughput": audio_seconds / sum(latencies),
+        "unit": "s audio/s",
+        "wer": sum(errors) / len(errors),
+        "load_seconds": load_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "samples": len(samples),
+    }
+
+def benchmark_asr(directory: str, backends: list[str], model_size: str) -> Dict[str, Any]:
+    samples = load_asr_samples(directory)
+    if not samples:
+        logging.error(f"❌ Aucun échantillon dans {directory} (générez-les avec --make-asr-samples)")
+        sys.exit(1)
+
+    results = {}
+    for backend_name in backends:
+        key = f"asr:{backend_name}"
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(run_asr_backend, backend_name, model_size, samples).result()
+        results[key] = result
+        if "skipped" in result:
+            logging.info(f"⏭️ {key:<24} ignoré ({result['skipped']})")
+        else:
+            logging.info(
+                f"⏱️ {key:<24} p50 {result['p50']:.3f}s | {result['throughput']:.1f} {result['unit']} "
+                f"| WER {result['wer']:.1%} | chargement {result['load_seconds']:.1f}s "
+                f"| RSS max {result['peak_rss_mb']:.0f} Mo"
+            )
+    return results
+
+def run_stages(args) -> Dict[str, Any]:
+    # Faux Ollama local pour l'étape de résumé
+    from fake_ollama import start_in_background
+    server, ollama_url = start_in_background(latency=0.05)
+    options = {"whisper": args.whisper, "tts": args.tts, "ollama_url": ollama_url}
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        stages = args.stages.split(",")
+        for minutes in [float(m) for m in args.sizes.split(",")]:
+            # Entrées générées dans le processus parent, avant les processus de mesure
+            if AUDIO_STAGES.intersection(stages):
+                synthetic_audio(minutes, _audio_input_path(workdir, minutes))
+            for stage in stages:
+                key = f"{stage}@{minutes:g}min"
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    result = pool.submit(run_stage, stage, minutes, args.repeats, workdir, options).result()
+                results[key] = result
+                if "skipped" in result:
+                    logging.info(f"⏭️ {key:<24} ignoré ({result['skipped']})")
+                else:
+                    logging.info(
+                        f"⏱️ {key:<24} p50 {result['p50']:.3f}s p95 {result['p95']:.3f}s p99 {result['p99']:.3f}s "
+                        f"| {result['throughput']:.1f} {result['unit']} | RSS max {result['peak_rss_mb']:.0f} Mo"
+                    )
+    server.shutdown()
+    return results
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(results: Dict[str, Any], baseline_path: str, threshold: float) -> bool:
+    """Affiche l'écart de latence p50 avec la référence ; retourne False en cas de régression."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    ok = True
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous or "p50" not in previous or "p50" not in current:
+            continue
+        delta = (current["p50"] - previous["p50"]) / previous["p50"]
+        flag = "🔴" if delta > threshold else "🟢"
+        ok &= delta <= threshold
+        logging.info(f"{flag} {key:<24} p50 {previous['p50']:.3f}s → {current['p50']:.3f}s ({delta:+.1%})")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne du pipeline")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--sizes", default="1,10,60", help="durées simulées en minutes")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--whisper", default="stub", help="'stub' ou taille de modèle locale (ex : tiny)")
+    parser.add_argument("--tts", default="stub", choices=["stub", "model"])
+    parser.add_argument("--save", nargs="?", const="", help="enregistre la référence (nom par défaut : commit)")
+    parser.add_argument("--compare", help="fichier de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10, help="régression tolérée sur le p50")
+    parser.add_argument("--asr", metavar="DIR", help="compare les moteurs ASR sur les échantillons de DIR")
+    parser.add_argument("--backends", default=",".join(ASR_BACKENDS), help="moteurs ASR comparés avec --asr")
+    parser.add_argument("--make-asr-samples", metavar="DIR", help="génère le jeu d'échantillons ASR dans DIR")
+    args = parser.parse_args()
+
+    if args.make_asr_samples:
+        make_asr_samples(args.make_asr_samples)
+        return
+
+    if args.asr:
+        results = benchmark_asr(args.asr, args.backends.split(","), args.whisper)
+    else:
+        results = run_stages(args)
+
+    if args.save is not None:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save or git_revision()}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"revision": git_revision(), "created_at": time.time(), "options": vars(args),
+                       "results": results}, f, indent=2, ensure_ascii=False)
+        logging.info(f"💾 Référence enregistrée : {path}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
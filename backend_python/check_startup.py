@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+import logging
+import tempfile
+import subprocess
+
+# Vérifie que l'import des services reste rapide et sans effet de bord :
+#   python check_startup.py [module ...]
+# Code de sortie 1 si un module ne s'importe pas, dépasse le budget, importe une
+# bibliothèque lourde ou crée des fichiers dans le répertoire courant.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODULES = ["main_api", "tts_api", "transcription", "resume", "text_to_speech", "download_models", "pipeline", "upload", "asr_backends"]
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "1.5"))
+# Ces bibliothèques ne doivent être importées qu'au premier usage d'un modèle
+HEAVY_MODULES = ["torch", "whisper", "spacy", "TTS", "transformers"]
+TOP_IMPORTS = 5
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+def _slowest_imports(importtime_output: str) -> list[tuple[int, str]]:
+    """Extrait les imports les plus coûteux (temps cumulé, en µs) de la sortie de -X importtime."""
+    entries = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)[:TOP_IMPORTS]
+
+def check_module(module: str) -> bool:
+    code = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR, "PYTHONDONTWRITEBYTECODE": "1"}
+
+    # Répertoire courant vide : tout fichier créé à l'import est un effet de bord
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              cwd=workdir, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        created = os.listdir(workdir)
+
+    if proc.returncode != 0:
+        last_line = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "?"
+        logging.error(f"❌ {module} : import impossible ({last_line})")
+        return False
+
+    ok = True
+    heavy = json.loads(proc.stdout.strip().splitlines()[-1])
+    if elapsed > STARTUP_BUDGET_SECONDS:
+        logging.error(f"❌ {module} : {elapsed:.2f}s > budget de {STARTUP_BUDGET_SECONDS:.2f}s")
+        ok = False
+    if heavy:
+        logging.error(f"❌ {module} : bibliothèques lourdes importées au démarrage : {', '.join(heavy)}")
+        ok = False
+    if created:
+        logging.error(f"❌ {module} : fichiers créés à l'import : {', '.join(created)}")
+        ok = False
+
+    if ok:
+        logging.info(f"✅ {module} : {elapsed:.2f}s")
+    for cumulative, name in _slowest_imports(proc.stderr):
+        logging.info(f"   {cumulative / 1000:8.1f} ms  {name}")
+    return ok
+
+def main():
+    modules = sys.argv[1:] or DEFAULT_MODULES
+    results = [check_module(module) for module in modules]
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ MODELS_DIR = Path("models")
 WHISPER_MODEL_SIZE = "base"
 TTS_MODEL = "tts_models/fr/css10/vits"
 TTS_MODEL_NAME = "tts_models/fr/css10/vits"
+TTS_SPEAKER = os.getenv("TTS_SPEAKER", "")  # Vide = premier locuteur du modèle (s'il en a plusieurs)
 SPACY_MODEL_NAME = "fr_core_news_md"
 OLLAMA_MODEL = "mistral"
 
@@ -25,8 +26,7 @@ MAIN_API_PORT = 8000
 TTS_API_PORT = 8001
 OLLAMA_PORT = 11434
 
-# Création des répertoires
-MODELS_DIR.mkdir(exist_ok=True)
+# Répertoires des modèles
 WHISPER_DIR = MODELS_DIR / "whisper"
 TTS_DIR = MODELS_DIR / "tts"
 SPACY_DIR = MODELS_DIR / "spacy"
@@ -41,6 +41,8 @@ SPACY_MODEL_DIR = MODELS_DIR / "spacy"
 # Configuration Ollama
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "localhost")
 
-# Création des dossiers nécessaires
-for directory in [MODELS_DIR, WHISPER_MODEL_DIR, TTS_MODEL_DIR, SPACY_MODEL_DIR]:
-    directory.mkdir(parents=True, exist_ok=True) 
\ No newline at end of file
+def ensure_directories():
+    """Création des dossiers nécessaires (appelée explicitement, jamais à l'import)"""
+    for directory in [MODELS_DIR, WHISPER_MODEL_DIR, TTS_MODEL_DIR, SPACY_MODEL_DIR]:
+        directory.mkdir(parents=True, exist_ok=True)
+ 
\ No newline at end of file
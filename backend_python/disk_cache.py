@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+from metrics import CACHE_REQUESTS
+
+# Logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+# Après un dépassement du budget, l'éviction descend jusqu'à cette fraction (évite un passage à chaque écriture)
+EVICT_LOW_WATERMARK = 0.9
+
+def hash_file(path: str, *extra: str) -> str:
+    """SHA-256 du contenu d'un fichier (lu par blocs) et de paramètres additionnels."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    for value in extra:
+        digest.update(b"\0" + value.encode("utf-8"))
+    return digest.hexdigest()
+
+def hash_text(*parts: str) -> str:
+    """SHA-256 stable (contrairement à hash()) d'une suite de chaînes."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+class DiskLRUCache:
+    """Cache sur disque adressé par contenu, borné en octets, éviction LRU (via mtime).
+
+    La taille totale est suivie en mémoire : le dossier n'est parcouru qu'au premier usage
+    et lorsque le budget est dépassé (pour se resynchroniser avec les autres processus).
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ".json", name: str = "disk"):
+        self.name = name
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        # Entrées connues, de la moins à la plus récemment utilisée, et leur taille
+        self._index: Optional["OrderedDict[Path, int]"] = None
+        self._total = 0
+        # Chemins réservés, écrits par l'appelant et pris en compte au prochain evict()
+        self._reserved: set = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _scan(self):
+        """Reconstruit l'index depuis le disque (appelé avec self._lock)."""
+        entries = []
+        for path in self.directory.glob(f"*/*{self.suffix}"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        self._index = OrderedDict((path, size) for _, size, path in sorted(entries))
+        self._total = sum(self._index.values())
+
+    def _track(self, path: Path, size: int):
+        """Enregistre une entrée écrite ou remplacée (appelé avec self._lock)."""
+        if self._index is None:
+            self._scan()
+            return
+        self._total += size - self._index.pop(path, 0)
+        self._index[path] = size
+
+    def path_for(self, key: str) -> Path:
+        # Sous-dossiers sur 2 caractères pour ne pas surcharger un seul répertoire
+        return self.directory / key[:2] / f"{key}{self.suffix}"
+
+    def reserve_path(self, key: str) -> Path:
+        """Chemin où écrire une nouvelle entrée (à faire suivre d'un appel à evict())."""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._reserved.add(path)
+        return path
+
+    def get_path(self, key: str) -> Optional[Path]:
+        """Retourne le chemin de l'entrée si elle existe (et la marque comme récemment utilisée)."""
+        path = self.path_for(key)
+        try:
+            # utime échoue si l'entrée n'existe pas (ou vient d'être évincée par un autre thread)
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                if self._index is not None:
+                    self._total -= self._index.pop(path, 0)
+        else:
+            with self._lock:
+                if self._index is not None and path in self._index:
+                    self._index.move_to_end(path)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return path
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        return None
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Entrée de cache illisible {path} : {e}")
+            path.unlink(missing_ok=True)
+            with self._lock:
+                if self._index is not None:
+                    self._total -= self._index.pop(path, 0)
+            return None
+
+    def put(self, key: str, value: Any):
+        self._write(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def put_bytes(self, key: str, data: bytes) -> Path:
+        return self._write(key, data)
+
+    def put_file(self, key: str, source: str) -> Path:
+        with open(source, "rb") as f:
+            return self._write(key, f.read())
+
+    def _write(self, key: str, data: bytes) -> Path:
+        path = self.reserve_path(key)
+        # Écriture atomique : un lecteur concurrent ne voit jamais de fichier partiel
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._reserved.discard(path)
+            self._track(path, len(data))
+        self.evict()
+        return path
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées si le budget en octets est dépassé."""
+        with self._lock:
+            if self._index is None:
+                self._scan()
+            for path in self._reserved:
+                try:
+                    self._track(path, path.stat().st_size)
+                except FileNotFoundError:
+                    continue
+            self._reserved.clear()
+
+            if self._total <= self.max_bytes:
+                return
+            # Budget dépassé : resynchronisation avec le disque puis éviction jusqu'au seuil bas
+            self._scan()
+            target = self.max_bytes * EVICT_LOW_WATERMARK
+            while self._index and self._total > target:
+                path, size = self._index.popitem(last=False)
+                path.unlink(missing_ok=True)
+                self._total -= size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "max_bytes": self.max_bytes,
+                "bytes": self._total if self._index is not None else None}
@@ -1,11 +1,13 @@
 import os
 import sys
+import json
 import shutil
+import hashlib
 import logging
-import requests
+import importlib.util
 from pathlib import Path
-import torch
-from config import IS_MAIN_SERVICE, IS_TTS_SERVICE, OLLAMA_MODEL
+from typing import Any, Dict, Optional
+from config import IS_MAIN_SERVICE, IS_TTS_SERVICE, OLLAMA_MODEL, ensure_directories
 
 # Configuration des logs
 logging.basicConfig(
@@ -23,15 +25,14 @@ TTS_MODEL = "tts_models/fr/css10/vits"  # Alias pour TTS_MODEL_NAME
 TTS_MODEL_NAME = "tts_models/fr/css10/vits"
 SPACY_MODEL_NAME = "fr_core_news_md"
 
-# Configuration Ollama
-OLLAMA_API_URL = "http://ollama:11434/api"
-
-# Création des répertoires
-MODELS_DIR.mkdir(exist_ok=True)
+# Répertoires des modèles (créés par download_models(), pas à l'import)
 WHISPER_DIR = MODELS_DIR / "whisper"
 TTS_DIR = MODELS_DIR / "tts"
 SPACY_DIR = MODELS_DIR / "spacy"
 OLLAMA_DIR = MODELS_DIR / "ollama"
+MODEL_DIR = str(WHISPER_DIR)
+MANIFEST_PATH = MODELS_DIR / "manifest.json"
+SPACY_MODEL = SPACY_MODEL_NAME
 
 def get_whisper():
     """Importe whisper uniquement si nécessaire"""
@@ -60,105 +61,169 @@ def check_disk_space():
 
 def check_ollama_status():
     """Vérifie le statut d'Ollama via l'API"""
+    from ollama_client import get_client, OllamaError
     try:
-        response = requests.get(f"{OLLAMA_API_URL}/version")
-        if response.status_code == 200:
-            return True
-    except requests.exceptions.RequestException:
+        return get_client().version() is not None
+    except OllamaError:
         return False
-    return False
 
 def check_mistral_model():
     """Vérifie si le modèle Mistral est disponible"""
+    from ollama_client import get_client, OllamaError
     try:
-        response = requests.get(f"{OLLAMA_API_URL}/tags")
-        if response.status_code == 200:
-            models = response.json().get("models", [])
-            return any(model["name"] == OLLAMA_MODEL for model in models)
-    except requests.exceptions.RequestException:
+        return any(name == OLLAMA_MODEL or name.startswith(OLLAMA_MODEL + ":")
+                   for name in get_client().list_models())
+    except OllamaError:
         return False
-    return False
 
-def verify_models():
-    """Vérifie si tous les modèles sont présents"""
-    models_status = {}
-    
-    # Vérification des modèles pour le service principal
+def tts_model_dir() -> Path:
+    """Dossier où Coqui TTS range le modèle (sans importer TTS)"""
+    data_dir = os.getenv("TTS_HOME") or os.getenv("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return Path(data_dir) / "tts" / TTS_MODEL_NAME.replace("/", "--")
+
+def spacy_model_dir() -> Optional[Path]:
+    """Dossier du paquet du modèle Spacy (sans importer spacy)"""
+    spec = importlib.util.find_spec(SPACY_MODEL_NAME)
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return Path(list(spec.submodule_search_locations)[0])
+
+def model_locations() -> Dict[str, Optional[Path]]:
+    """Modèles attendus pour le service courant"""
+    locations = {}
     if IS_MAIN_SERVICE:
-        models_status.update({
-            "whisper": False,
-            "spacy": False,
-            "ollama": False,
-            "mistral": False
-        })
-        
-        # Vérification Whisper
-        whisper = get_whisper()
-        if whisper:
-            whisper_model_path = WHISPER_DIR / f"{WHISPER_MODEL_SIZE}.pt"
-            models_status["whisper"] = whisper_model_path.exists()
-        
-        # Vérification Spacy
-        spacy = get_spacy()
-        if spacy:
-            try:
-                spacy.load(SPACY_MODEL_NAME)
-                models_status["spacy"] = True
-            except (OSError, ImportError):
-                pass
-        
-        # Vérification Ollama et Mistral
-        models_status["ollama"] = check_ollama_status()
-        if models_status["ollama"]:
-            models_status["mistral"] = check_mistral_model()
-    
-    # Vérification des modèles pour le service TTS
+        locations["whisper"] = WHISPER_DIR / f"{WHISPER_MODEL_SIZE}.pt"
+        locations["spacy"] = spacy_model_dir()
     if IS_TTS_SERVICE:
-        models_status.update({
-            "tts": False
-        })
-        try:
-            from TTS.api import TTS
-            tts = TTS(model_name=TTS_MODEL_NAME, progress_bar=False)
-            models_status["tts"] = True
-        except Exception:
-            pass
-    
+        locations["tts"] = tts_model_dir()
+    return locations
+
+def _files(path: Path) -> list[Path]:
+    if path.is_file():
+        return [path]
+    return sorted(p for p in path.rglob("*") if p.is_file() and "__pycache__" not in p.parts)
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _read_manifest() -> Optional[Dict[str, Any]]:
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)["models"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def write_manifest(names: Optional[set] = None) -> Dict[str, Any]:
+    """Enregistre chemin, taille et empreinte SHA-256 de chaque fichier des modèles
+
+    Avec `names`, seules ces entrées sont recalculées ; les autres restent celles du manifeste existant.
+    """
+    manifest = {"models": {}}
+    existing = _read_manifest() or {}
+    for name, location in model_locations().items():
+        if names is not None and name not in names:
+            if name in existing:
+                manifest["models"][name] = existing[name]
+            continue
+        if location is None or not location.exists():
+            logging.warning(f"⚠️ Modèle {name} introuvable, absent du manifeste")
+            continue
+        manifest["models"][name] = {
+            "path": str(location),
+            "files": [
+                {"path": str(f), "size": f.stat().st_size, "sha256": _sha256(f)}
+                for f in _files(location)
+            ],
+        }
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    logging.info(f"📜 Manifeste des modèles écrit : {MANIFEST_PATH}")
+    return manifest
+
+def verify_manifest(check_digests: bool = True) -> Dict[str, bool]:
+    """Vérifie les fichiers des modèles d'après le manifeste, sans jamais charger de modèle.
+
+    Sans check_digests, seules la présence et la taille des fichiers sont contrôlées (quelques ms).
+    """
+    manifest = _read_manifest()
+    if manifest is None:
+        return {name: False for name in model_locations()}
+
+    status = {}
+    for name in model_locations():
+        entry = manifest.get(name)
+        ok = bool(entry and entry["files"])
+        for file in (entry or {}).get("files", []):
+            path = Path(file["path"])
+            if not path.is_file() or path.stat().st_size != file["size"]:
+                ok = False
+                break
+            if check_digests and _sha256(path) != file["sha256"]:
+                ok = False
+                break
+        status[name] = ok
+    return status
+
+def verify_models(check_digests: bool = False) -> Dict[str, bool]:
+    """Vérifie si tous les modèles sont présents (manifeste + API Ollama, aucun chargement)"""
+    models_status = verify_manifest(check_digests)
+
+    # Vérification Ollama et Mistral
+    if IS_MAIN_SERVICE:
+        models_status["ollama"] = check_ollama_status()
+        models_status["mistral"] = models_status["ollama"] and check_mistral_model()
+
     return models_status
 
 def download_models():
-    """Télécharge les modèles nécessaires"""
+    """Télécharge les modèles manquants ; le manifeste n'est réécrit que pour eux"""
     try:
+        # Modèles absents avant ce lancement (les autres ne sont ni rechargés ni rehachés)
+        missing = {name for name, location in model_locations().items() if location is None or not location.exists()}
+        if not missing and MANIFEST_PATH.is_file():
+            logging.info("Tous les modèles sont déjà présents")
+            return
+
         # Vérifier l'espace disque
         check_disk_space()
         
         # Créer les répertoires
-        MODELS_DIR.mkdir(exist_ok=True)
+        ensure_directories()
         
         # Télécharger les modèles selon le service
-        if IS_MAIN_SERVICE:
-            # Télécharger Whisper
+        if "whisper" in missing:
             logging.info("Téléchargement du modèle Whisper...")
             import whisper
-            whisper.load_model(WHISPER_MODEL_SIZE)
+            whisper.load_model(WHISPER_MODEL_SIZE, download_root=MODEL_DIR)
             
-            # Télécharger Spacy
+        if "spacy" in missing:
             logging.info("Téléchargement du modèle Spacy...")
             import spacy
             spacy.load(SPACY_MODEL_NAME)
             
-        if IS_TTS_SERVICE:
-            # Télécharger TTS
+        if "tts" in missing:
             logging.info("Téléchargement du modèle TTS...")
             from TTS.api import TTS
             TTS(model_name=TTS_MODEL_NAME)
             
         logging.info("Tous les modèles ont été téléchargés avec succès")
+        # Manifeste absent : première écriture complète ; sinon seules les entrées téléchargées changent
+        write_manifest(missing if MANIFEST_PATH.is_file() else None)
         
     except Exception as e:
         logging.error(f"Erreur lors du téléchargement des modèles: {str(e)}")
         raise
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--verify":
+        # Vérification complète (empreintes SHA-256), sans charger les modèles
+        status = verify_models(check_digests=True)
+        logging.info(json.dumps(status))
+        sys.exit(0 if all(status.values()) else 1)
     download_models()
     
\ No newline at end of file
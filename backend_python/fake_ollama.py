@@ -0,0 +1,107 @@
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Faux serveur Ollama pour tester le résumé hors ligne (tests de charge, benchmarks)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+DEFAULT_MODEL = "mistral:7b"
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Paramètres partagés, définis par make_server()
+    latency = 0.0
+    token_delay = 0.0
+    ratio = 0.25
+    models = [DEFAULT_MODEL]
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": name} for name in self.models]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        if self.path != "/api/chat":
+            self._send_json({"error": "not found"}, 404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        text = request.get("messages", [{}])[-1].get("content", "")
+        # Réponse déterministe : les premiers mots du texte, ~25 % de sa longueur
+        words = text.split()
+        words = words[:max(1, int(len(words) * self.ratio))]
+        time.sleep(self.latency)
+
+        if not request.get("stream", True):
+            self._send_json({"model": request.get("model"), "message": {"role": "assistant", "content": " ".join(words)},
+                             "done": True})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            time.sleep(self.token_delay)
+            self._write_chunk({"message": {"role": "assistant", "content": word if i == 0 else " " + word}, "done": False})
+        self._write_chunk({"message": {"role": "assistant", "content": ""}, "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, payload: dict):
+        data = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+def make_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                token_delay: float = 0.0) -> ThreadingHTTPServer:
+    """Crée le serveur (port 0 = port libre choisi par le système)."""
+    handler = type("Handler", (FakeOllamaHandler,), {"latency": latency, "token_delay": token_delay})
+    return ThreadingHTTPServer((host, port), handler)
+
+def start_in_background(**kwargs) -> tuple[ThreadingHTTPServer, str]:
+    """Démarre le serveur dans un thread et retourne (serveur, url de base)."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Faux serveur Ollama pour les tests hors ligne")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.5, help="latence avant la première réponse (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="délai entre deux tokens (s)")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.token_delay)
+    logging.info(f"🧪 Faux Ollama sur http://{args.host}:{args.port} (OLLAMA_BASE_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
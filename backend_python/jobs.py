@@ -0,0 +1,152 @@
+import os
+import copy
+import time
+import uuid
+import queue
+import logging
+import threading
+from typing import Callable, Dict, Any, Optional
+
+# Configuration de la file de traitements
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Concurrence maximale par étape (ex : une seule transcription à la fois sur CPU)
+STAGE_CONCURRENCY = {
+    "transcription": int(os.getenv("TRANSCRIPTION_CONCURRENCY", "1")),
+    "summary": int(os.getenv("SUMMARY_CONCURRENCY", "2")),
+    "tts": int(os.getenv("TTS_CONCURRENCY", "1")),
+}
+# Durée de conservation des traitements terminés (secondes)
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+# Logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+class QueueFullError(Exception):
+    """La file de traitements est pleine."""
+
+class JobManager:
+    """Exécute les étapes transcription → résumé → TTS dans un pool de workers borné."""
+
+    def __init__(self, stages: Dict[str, Callable[[Dict[str, Any]], Any]],
+                 queue_size: int = JOB_QUEUE_SIZE, workers: int = JOB_WORKERS,
+                 stage_concurrency: Dict[str, int] = STAGE_CONCURRENCY):
+        self.stages = stages
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=queue_size)
+        self._semaphores = {
+            name: threading.BoundedSemaphore(max(1, stage_concurrency.get(name, 1)))
+            for name in stages
+        }
+        self._lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        self._started = False
+
+    def start(self):
+        if not self._started:
+            for worker in self._workers:
+                worker.start()
+            self._started = True
+
+    def submit(self, params: Dict[str, Any], stages: Optional[list[str]] = None) -> str:
+        stages = stages or list(self.stages)
+        unknown = [s for s in stages if s not in self.stages]
+        if unknown:
+            raise ValueError(f"Étapes inconnues : {', '.join(unknown)}")
+        duplicates = sorted({s for s in stages if stages.count(s) > 1})
+        if duplicates:
+            raise ValueError(f"Étapes en double : {', '.join(duplicates)}")
+        # Toujours dans l'ordre du pipeline, quel que soit l'ordre demandé
+        order = list(self.stages)
+        stages = sorted(stages, key=order.index)
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "created_at": time.time(),
+            "params": params,
+            "stages": {name: {"status": "pending"} for name in stages},
+            "result": {},
+        }
+        with self._lock:
+            self._cleanup()
+            self.jobs[job_id] = job
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            with self._lock:
+                self.jobs.pop(job_id, None)
+            raise QueueFullError("File de traitements pleine, réessayez plus tard")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Copie du traitement : les workers modifient l'original pendant la sérialisation."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return copy.deepcopy(job) if job is not None else None
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def in_flight(self) -> int:
+        return sum(1 for job in list(self.jobs.values()) if job["status"] == "running")
+
+    def _cleanup(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.get("finished_at") and now - job["finished_at"] > JOB_TTL_SECONDS
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(self.jobs[job_id])
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Dict[str, Any]):
+        # Toute modification se fait sous le verrou : get() et public_view() copient sous ce même verrou
+        with self._lock:
+            job["status"] = "running"
+        try:
+            for name, stage in job["stages"].items():
+                with self._semaphores[name]:
+                    with self._lock:
+                        stage["status"] = "running"
+                        stage["started_at"] = time.time()
+                    try:
+                        result = self.stages[name](job)
+                        with self._lock:
+                            job["result"][name] = result
+                            stage["status"] = "done"
+                    except Exception as e:
+                        logging.error(f"❌ Traitement {job['id']} : échec de l'étape {name} : {e}")
+                        with self._lock:
+                            stage["status"] = "failed"
+                            stage["error"] = str(e)
+                            job["status"] = "failed"
+                        return
+                    finally:
+                        with self._lock:
+                            stage["finished_at"] = time.time()
+            with self._lock:
+                job["status"] = "done"
+        finally:
+            with self._lock:
+                job["finished_at"] = time.time()
+
+    def public_view(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Représentation renvoyée par l'API (sans les paramètres internes)."""
+        with self._lock:
+            return copy.deepcopy({key: job[key] for key in ("id", "status", "stages", "result") if key in job})
@@ -1,16 +1,25 @@
 import os
 import logging
-from fastapi import FastAPI, UploadFile, HTTPException, Depends, Header
+from fastapi import FastAPI, Request, HTTPException, Depends, Header
 from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+import json
 import secrets
-from transcription import transcribe_audio
-from resume import generate_summary
-from download_models import MODEL_DIR
+from transcription import transcribe_audio, transcribe_stream, transcribe_batch, AUDIO_UPLOAD_DIR, OUTPUT_BASE_DIR, SUPPORTED_FORMATS
+from resume import generate_summary, summarize_file, get_nlp, nlp_loaded, BASE_DIR, RESUME_FILENAME
+from jobs import JobManager, QueueFullError
+from pipeline import synthesize_summary, AUDIO_RESUME_FILENAME
+from upload import save_upload, UploadTooLargeError, MAX_UPLOAD_BYTES
+from model_registry import registry
+import asr_backends
+import metrics
 
 app = FastAPI()
+metrics.install(app, "main")
 
 # Clé API pour l'authentification entre services
 API_KEY = os.getenv("INTERNAL_API_KEY", secrets.token_hex(32))
@@ -21,25 +30,176 @@ async def verify_api_key(x_api_key: str = Header(...)):
         raise HTTPException(status_code=403, detail="Invalid API key")
     return x_api_key
 
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "256"))
+
+class AudioItem(BaseModel):
+    audio_id: str
+    audio_ext: str
+
+class BatchRequest(BaseModel):
+    items: list[AudioItem]
+
+class JobRequest(BaseModel):
+    audio_id: str
+    audio_ext: str
+    stages: Optional[list[str]] = None
+
+def run_transcription_stage(job: Dict[str, Any]) -> str:
+    params = job["params"]
+    return transcribe_audio(params["audio_id"], params["audio_ext"])
+
+def run_summary_stage(job: Dict[str, Any]) -> str:
+    audio_dir = os.path.join(BASE_DIR, job["params"]["audio_id"])
+    input_path = job["result"].get("transcription") or os.path.join(audio_dir, "transcription.txt")
+    output_path = os.path.join(audio_dir, RESUME_FILENAME)
+    summarize_file(input_path, output_path)
+    return output_path
+
+def run_tts_stage(job: Dict[str, Any]) -> str:
+    # L'audio est écrit dans static/file/<audio_id>/ : le cache du service TTS peut être évincé
+    audio_id = job["params"]["audio_id"]
+    audio_dir = os.path.join(BASE_DIR, audio_id)
+    summary_path = job["result"].get("summary") or os.path.join(audio_dir, RESUME_FILENAME)
+    with open(summary_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    output_path = os.path.join(audio_dir, AUDIO_RESUME_FILENAME)
+    synthesize_summary(audio_id, text, output_path)
+    return output_path
+
+job_manager = JobManager({
+    "transcription": run_transcription_stage,
+    "summary": run_summary_stage,
+    "tts": run_tts_stage,
+})
+
+metrics.QUEUE_DEPTH.set_function(job_manager.queue_depth)
+metrics.JOBS_IN_FLIGHT.set_function(job_manager.in_flight)
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_manager.start()
+
+# Sans préchargement, Whisper est chargé à la première transcription et n'entre pas dans /readyz
+WHISPER_PRELOAD = os.getenv("WHISPER_PRELOAD", "1") == "1"
+
+@app.on_event("startup")
+async def preload_models():
+    # Les modèles Whisper restent chargés pendant toute la durée de vie du service
+    if WHISPER_PRELOAD:
+        try:
+            await run_in_threadpool(asr_backends.preload)
+        except FileNotFoundError as e:
+            logging.warning(f"⚠️ Préchargement Whisper ignoré : {e}")
+    try:
+        await run_in_threadpool(get_nlp)
+    except RuntimeError as e:
+        logging.warning(f"⚠️ Préchargement Spacy ignoré : {e}")
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness : le processus répond (aucun modèle n'est chargé ni vérifié)."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness : les modèles sont résidents en mémoire (ne déclenche jamais de chargement)."""
+    models = {"spacy": nlp_loaded()}
+    if WHISPER_PRELOAD:
+        models["whisper"] = asr_backends.preloaded()
+    if not all(models.values()):
+        raise HTTPException(status_code=503, detail={"status": "loading", "models": models})
+    return {"status": "ready", "models": models}
+
+@app.get("/models/stats")
+async def models_stats(api_key: str = Depends(verify_api_key)):
+    return registry.stats()
+
 @app.post("/transcribe")
 async def transcribe(
-    audio_file: UploadFile,
+    request: Request,
+    audio_ext: str,
     api_key: str = Depends(verify_api_key)
 ):
+    """Transcrit le fichier audio envoyé brut dans le corps (Content-Type: audio/*).
+
+    Le corps est lu par blocs et écrit directement sur disque : il n'est jamais chargé en mémoire.
+    """
+    # Vérification du type de fichier
+    if not request.headers.get("content-type", "").startswith("audio/"):
+        raise HTTPException(status_code=400, detail="File must be an audio file")
+    if f".{audio_ext.lower()}" not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported audio format")
+
+    # Refus immédiat si la taille annoncée dépasse la limite (avant de lire le corps)
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+
     try:
-        # Vérification du type de fichier
-        if not audio_file.content_type.startswith('audio/'):
-            raise HTTPException(status_code=400, detail="File must be an audio file")
-        
-        # Vérification de la taille du fichier (max 100MB)
-        if audio_file.size > 100 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File too large")
-        
-        # Traitement du fichier
-        result = transcribe_audio(audio_file)
-        return {"transcription": result}
+        audio_id, deduplicated = await save_upload(request.stream(), audio_ext.lower())
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        result = await run_in_threadpool(transcribe_audio, audio_id, audio_ext.lower())
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"audio_id": audio_id, "transcription": result, "deduplicated": deduplicated}
+
+@app.get("/transcribe/stream")
+def transcribe_streaming(
+    audio_id: str,
+    audio_ext: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Transcription en streaming (Server-Sent Events) : un événement par segment."""
+    if "/" in audio_id or "/" in audio_ext or ".." in audio_id:
+        raise HTTPException(status_code=400, detail="Invalid audio id")
+
+    def events():
+        try:
+            for segment in transcribe_stream(audio_id, audio_ext):
+                yield f"data: {json.dumps(segment, ensure_ascii=False)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logging.error(f"❌ Erreur de transcription en streaming : {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+def run_transcription_batch(items: list[AudioItem]) -> list[Dict[str, Any]]:
+    paths = [os.path.join(AUDIO_UPLOAD_DIR, f"{item.audio_id}.{item.audio_ext}") for item in items]
+    results = transcribe_batch(paths)
+
+    response = []
+    for item, result in zip(items, results):
+        if "error" in result:
+            response.append({"audio_id": item.audio_id, "error": result["error"]})
+            continue
+        output_dir = os.path.join(OUTPUT_BASE_DIR, item.audio_id)
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, "transcription.txt")
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(result["text"])
+        response.append({"audio_id": item.audio_id, "transcription": output_path, "text": result["text"]})
+    return response
+
+@app.post("/transcribe/batch")
+async def transcribe_many(
+    request: BatchRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Transcription par lots : résultats renvoyés dans l'ordre des fichiers demandés."""
+    if not request.items or len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_BATCH_ITEMS} items expected")
+    for item in request.items:
+        if "/" in item.audio_id or "/" in item.audio_ext or ".." in item.audio_id:
+            raise HTTPException(status_code=400, detail="Invalid audio id")
+
+    results = await run_in_threadpool(run_transcription_batch, request.items)
+    return {"results": results}
 
 @app.post("/summarize")
 async def summarize(
@@ -51,7 +211,33 @@ async def summarize(
         if len(text) > 100000:  # 100k caractères max
             raise HTTPException(status_code=400, detail="Text too long")
         
-        result = generate_summary(text)
+        result = await run_in_threadpool(generate_summary, text)
         return {"summary": result}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    request: JobRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Met en file le pipeline transcription → résumé → TTS et retourne immédiatement."""
+    if "/" in request.audio_id or "/" in request.audio_ext or ".." in request.audio_id:
+        raise HTTPException(status_code=400, detail="Invalid audio id")
+    try:
+        job_id = job_manager.submit(request.model_dump(exclude={"stages"}), request.stages)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_manager.public_view(job)
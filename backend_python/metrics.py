@@ -0,0 +1,202 @@
+import os
+import time
+import logging
+import threading
+import cProfile
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Dict, Optional
+
+# Métriques au format texte Prometheus, sans dépendance externe.
+# Les valeurs sont propres au processus (les workers des pools ne sont pas agrégés).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "static/profiles")
+# Profilage d'une requête à la demande (en-tête X-Profile: 1), désactivé par défaut
+PROFILING_ENABLED = os.getenv("ENABLE_PROFILING", "0") == "1"
+
+# Logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {v}" for k, v in self._values.items()]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[tuple, float] = {}
+        self._functions: Dict[tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """Valeur calculée à chaque lecture de /metrics (ex : profondeur de file)."""
+        with self._lock:
+            self._functions[tuple(sorted(labels.items()))] = function
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(k)} {v}" for k, v in values.items()]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[tuple, dict] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = self._values.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def _samples(self) -> list[str]:
+        lines = []
+        with self._lock:
+            for key, entry in self._values.items():
+                for bound, count in zip(self.buckets, entry["buckets"]):
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {entry['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {entry['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {entry['count']}")
+        return lines
+
+_registry: list[_Metric] = []
+
+# Métriques partagées par les deux services
+STAGE_SECONDS = Histogram("pipeline_stage_seconds", "Durée de chaque étape du pipeline")
+MODEL_LOAD_SECONDS = Histogram("model_load_seconds", "Durée de chargement des modèles")
+CACHE_REQUESTS = Counter("cache_requests_total", "Accès aux caches (result=hit|miss)")
+IN_FLIGHT = Gauge("in_flight_requests", "Requêtes HTTP en cours de traitement")
+QUEUE_DEPTH = Gauge("job_queue_depth", "Traitements en attente dans la file")
+JOBS_IN_FLIGHT = Gauge("jobs_in_flight", "Traitements en cours d'exécution")
+TTS_TTFB_SECONDS = Histogram("tts_stream_ttfb_seconds", "Temps jusqu'au premier morceau audio du streaming TTS")
+
+@contextmanager
+def span(stage: str, **fields):
+    """Mesure une étape : histogramme pipeline_stage_seconds + ligne de log structurée."""
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage=stage)
+        details = " ".join(f"{key}={value}" for key, value in fields.items())
+        logging.debug(f"⏱️ span={stage} status={status} duration_ms={duration * 1000:.1f} {details}".rstrip())
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def install(app, service: str):
+    """Ajoute /metrics, le suivi des requêtes en cours et le profilage optionnel à une app FastAPI."""
+    from fastapi import Request
+    from fastapi.responses import PlainTextResponse
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+    @app.middleware("http")
+    async def track_requests(request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+
+        # cProfile ne voit que le thread de la boucle d'événements : pour le travail exécuté
+        # dans le pool de threads, préférer py-spy (py-spy record --pid <pid>)
+        profiler: Optional[cProfile.Profile] = None
+        if PROFILING_ENABLED and request.headers.get("x-profile") == "1":
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        IN_FLIGHT.inc(service=service)
+        try:
+            response = await call_next(request)
+        except BaseException:
+            IN_FLIGHT.dec(service=service)
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                name = request.url.path.strip("/").replace("/", "_") or "root"
+                path = os.path.join(PROFILE_DIR, f"{service}_{name}_{int(time.time() * 1000)}.prof")
+                profiler.dump_stats(path)
+                logging.info(f"🔬 Profil enregistré : {path}")
+        # Le corps (SSE, streaming TTS) est envoyé après le retour de call_next : la requête
+        # reste en cours jusqu'à la fin de l'envoi ou la déconnexion du client
+        response.body_iterator = _release_in_flight(response.body_iterator, service)
+        return response
+
+async def _release_in_flight(body: AsyncIterator[bytes], service: str) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        IN_FLIGHT.dec(service=service)
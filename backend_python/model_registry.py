@@ -0,0 +1,140 @@
+import os
+import gc
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any
+from download_models import MODEL_DIR, WHISPER_MODEL_SIZE
+from metrics import MODEL_LOAD_SECONDS
+
+# Configuration du registre
+MAX_RESIDENT_MODELS = int(os.getenv("WHISPER_MAX_RESIDENT_MODELS", "2"))
+PRELOAD_MODEL_SIZES = [s for s in os.getenv("WHISPER_PRELOAD_SIZES", WHISPER_MODEL_SIZE).split(",") if s]
+
+# Logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+class WhisperModelRegistry:
+    """Garde les modèles Whisper chargés en mémoire entre les requêtes (éviction LRU)."""
+
+    def __init__(self, max_models: int = MAX_RESIDENT_MODELS, model_dir: str = MODEL_DIR):
+        self.max_models = max(1, max_models)
+        self.model_dir = model_dir
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        # Un verrou par modèle : Whisper n'est pas thread-safe pendant transcribe()
+        self._model_locks: Dict[str, threading.Lock] = {}
+        # Un verrou de chargement par modèle : charger une taille ne bloque pas l'accès aux autres
+        self._loading_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_times: Dict[str, float] = {}
+
+    def _load(self, key: str):
+        import whisper
+
+        # Clé "<taille>" ou "<taille>:int8" (même checkpoint, quantifié à la volée)
+        size, _, variant = key.partition(":")
+        model_path = os.path.join(self.model_dir, size + ".pt")
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"❌ Modèle Whisper non trouvé à {model_path}. Exécutez d'abord download_models.py")
+
+        logging.info(f"🧠 Chargement du modèle Whisper ({key})...")
+        start = time.perf_counter()
+        if variant == "int8":
+            model = quantize_int8(whisper.load_model(size, device="cpu", download_root=self.model_dir))
+        elif variant:
+            raise ValueError(f"❌ Variante de modèle Whisper inconnue : {variant}")
+        else:
+            model = whisper.load_model(size, download_root=self.model_dir)
+        self.load_times[key] = time.perf_counter() - start
+        MODEL_LOAD_SECONDS.observe(self.load_times[key], model=f"whisper-{key}")
+        logging.info(f"✅ Modèle Whisper ({key}) chargé en {self.load_times[key]:.2f}s")
+        return model
+
+    def get(self, size: str = WHISPER_MODEL_SIZE):
+        """Retourne le modèle (chargé une seule fois) et le verrou à tenir pendant son utilisation."""
+        with self._lock:
+            if size in self._models:
+                self.hits += 1
+                self._models.move_to_end(size)
+                return self._models[size], self._model_locks[size]
+            loading_lock = self._loading_locks.setdefault(size, threading.Lock())
+
+        # Chargement hors du verrou global ; les demandes concurrentes de la même taille attendent ici
+        with loading_lock:
+            with self._lock:
+                if size in self._models:
+                    self.hits += 1
+                    self._models.move_to_end(size)
+                    return self._models[size], self._model_locks[size]
+                self.misses += 1
+
+            model = self._load(size)
+
+            evicted_any = False
+            with self._lock:
+                self._models[size] = model
+                model_lock = self._model_locks[size] = threading.Lock()
+                while len(self._models) > self.max_models:
+                    evicted, _ = self._models.popitem(last=False)
+                    self._model_locks.pop(evicted, None)
+                    self.evictions += 1
+                    evicted_any = True
+                    logging.info(f"♻️ Modèle Whisper ({evicted}) retiré de la mémoire (LRU)")
+            if evicted_any:
+                gc.collect()
+            return model, model_lock
+
+    def preload(self, sizes=None):
+        """Charge les modèles configurés au démarrage du service."""
+        for size in sizes or PRELOAD_MODEL_SIZES:
+            self.get(size)
+
+    def register(self, size: str, model):
+        """Enregistre un modèle déjà construit (modèle de substitution pour les benchmarks hors ligne)."""
+        with self._lock:
+            self._models[size] = model
+            self._model_locks[size] = threading.Lock()
+            self.load_times[size] = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._model_locks.clear()
+            gc.collect()
+
+    def is_resident(self, size: str = WHISPER_MODEL_SIZE) -> bool:
+        return size in self._models
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resident": list(self._models.keys()),
+            "max_models": self.max_models,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "load_times": dict(self.load_times),
+        }
+
+def quantize_int8(model):
+    """Quantification dynamique int8 des couches linéaires (poids int8, activations quantifiées à la volée)."""
+    import torch
+
+    # Whisper utilise sa propre sous-classe de nn.Linear (qui ne fait que convertir le dtype) :
+    # quantize_dynamic ne reconnaît que nn.Linear exactement
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+# Registre partagé par tout le processus
+registry = WhisperModelRegistry()
+
+def get_whisper_model(size: str = WHISPER_MODEL_SIZE):
+    return registry.get(size)
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Iterator, AsyncIterator, Optional
+import httpx
+from config import OLLAMA_HOST, OLLAMA_PORT
+from metrics import span
+
+# Configuration du client Ollama
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", f"http://{OLLAMA_HOST}:{OLLAMA_PORT}")
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+# Délai maximum entre deux morceaux de réponse (pas la durée totale de génération)
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+OLLAMA_MAX_RETRIES = int(os.getenv("OLLAMA_MAX_RETRIES", "3"))
+OLLAMA_BACKOFF_SECONDS = float(os.getenv("OLLAMA_BACKOFF_SECONDS", "0.5"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "8"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+class OllamaError(RuntimeError):
+    """Erreur lors d'un appel à Ollama (après épuisement des tentatives)."""
+
+class _RetryableError(Exception):
+    pass
+
+def _timeout(read_timeout: Optional[float] = None) -> httpx.Timeout:
+    return httpx.Timeout(OLLAMA_CONNECT_TIMEOUT, read=read_timeout or OLLAMA_READ_TIMEOUT)
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS,
+                        max_keepalive_connections=OLLAMA_MAX_CONNECTIONS)
+
+def _backoff(attempt: int) -> float:
+    # Backoff exponentiel avec un peu d'aléa pour ne pas resynchroniser les clients
+    return OLLAMA_BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random() / 4)
+
+def _check_status(response: httpx.Response):
+    if response.status_code in RETRYABLE_STATUS:
+        raise _RetryableError(f"HTTP {response.status_code}")
+    if response.status_code >= 400:
+        response.read()
+        raise OllamaError(f"Ollama a répondu {response.status_code} : {response.text[:200]}")
+
+def _parse_lines(lines) -> Iterator[str]:
+    for line in lines:
+        if not line:
+            continue
+        data = json.loads(line)
+        if "error" in data:
+            raise OllamaError(data["error"])
+        content = data.get("message", {}).get("content", "")
+        if content:
+            yield content
+
+class OllamaClient:
+    """Client HTTP persistant (keep-alive, pool de connexions) pour toutes les requêtes Ollama."""
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, max_retries: int = OLLAMA_MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self._http = httpx.Client(base_url=self.base_url, timeout=_timeout(), limits=_limits())
+
+    def close(self):
+        self._http.close()
+
+    def _with_retries(self, func, description: str):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func()
+            except (httpx.TransportError, _RetryableError) as e:
+                if attempt == self.max_retries:
+                    raise OllamaError(f"{description} : échec après {attempt + 1} tentatives ({e})") from e
+                delay = _backoff(attempt)
+                logging.warning(f"⚠️ {description} : {e}, nouvelle tentative dans {delay:.1f}s")
+                time.sleep(delay)
+
+    def get_json(self, path: str, timeout: float = 5.0) -> dict:
+        def call():
+            response = self._http.get(path, timeout=timeout)
+            _check_status(response)
+            return response.json()
+        return self._with_retries(call, f"GET {path}")
+
+    def version(self) -> Optional[str]:
+        return self.get_json("/api/version").get("version")
+
+    def list_models(self) -> list[str]:
+        return [model["name"] for model in self.get_json("/api/tags").get("models", [])]
+
+    def chat_stream(self, model: str, messages: list[dict]) -> Iterator[str]:
+        """Génère la réponse morceau par morceau (réponse en streaming NDJSON)."""
+        payload = {"model": model, "messages": messages, "stream": True}
+        with self._http.stream("POST", "/api/chat", json=payload) as response:
+            _check_status(response)
+            yield from _parse_lines(response.iter_lines())
+
+    def chat(self, model: str, messages: list[dict]) -> str:
+        """Réponse complète ; la requête entière est rejouée en cas d'erreur transitoire."""
+        with span("ollama_chat", model=model):
+            return self._with_retries(lambda: "".join(self.chat_stream(model, messages)), f"chat {model}")
+
+class AsyncOllamaClient:
+    """Équivalent asynchrone, à créer dans la boucle d'événements qui l'utilise."""
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, max_retries: int = OLLAMA_MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self._http = httpx.AsyncClient(base_url=self.base_url, timeout=_timeout(), limits=_limits())
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def chat_stream(self, model: str, messages: list[dict]) -> AsyncIterator[str]:
+        payload = {"model": model, "messages": messages, "stream": True}
+        async with self._http.stream("POST", "/api/chat", json=payload) as response:
+            if response.status_code >= 400:
+                await response.aread()
+            _check_status(response)
+            async for line in response.aiter_lines():
+                for content in _parse_lines([line]):
+                    yield content
+
+    async def chat(self, model: str, messages: list[dict]) -> str:
+        with span("ollama_chat", model=model):
+            return await self._chat(model, messages)
+
+    async def _chat(self, model: str, messages: list[dict]) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return "".join([part async for part in self.chat_stream(model, messages)])
+            except (httpx.TransportError, _RetryableError) as e:
+                if attempt == self.max_retries:
+                    raise OllamaError(f"chat {model} : échec après {attempt + 1} tentatives ({e})") from e
+                delay = _backoff(attempt)
+                logging.warning(f"⚠️ chat {model} : {e}, nouvelle tentative dans {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+# Client partagé par tout le processus
+_client: Optional[OllamaClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> OllamaClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import subprocess
+import importlib.util
+import socket
+import logging
+import socketserver
+from typing import Dict, Any
+
+# Pipeline complet transcription → résumé → synthèse vocale dans un seul processus.
+#   python pipeline.py serve               : démarre le démon (modèles chargés une fois)
+#   python pipeline.py <audio_id> <ext>    : envoie un traitement au démon (ou l'exécute sur place)
+
+PIPELINE_SOCKET = os.getenv("PIPELINE_SOCKET", "/tmp/speech_pipeline.sock")
+OUTPUT_BASE_DIR = "static/file"
+TRANSCRIPTION_FILENAME = "transcription.txt"
+RESUME_FILENAME = "resum.txt"
+AUDIO_RESUME_FILENAME = "audio_resume.mp3"
+TTS_API_URL = os.getenv("TTS_API_URL", "http://tts_service:8001")
+TTS_TIMEOUT_SECONDS = float(os.getenv("TTS_TIMEOUT_SECONDS", "600"))
+# Interpréteur Python 3.10 (avec Coqui TTS) installé à côté des scripts, utilisé par le backend Go
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TTS_PYTHON = os.getenv("TTS_PYTHON", os.path.join(SCRIPT_DIR, "venv310", "bin", "python3"))
+
+# Logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+def _write_text(path: str, text: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def synthesize_summary(audio_id: str, summary: str, output_path: str):
+    """Synthèse dans le processus si Coqui TTS est installé, sinon dans le venv Python 3.10, sinon via le service TTS."""
+    if importlib.util.find_spec("TTS") is not None:
+        from text_to_speech import generate_tts_audio
+        generate_tts_audio(summary, output_path)
+        return
+
+    # Déploiement Go : text_to_speech.py relit le résumé déjà écrit dans static/file/<audio_id>/
+    if os.path.isfile(TTS_PYTHON):
+        subprocess.run([TTS_PYTHON, os.path.join(SCRIPT_DIR, "text_to_speech.py"), audio_id], check=True)
+        return
+
+    # Déploiement Docker : l'audio revient dans la réponse (aucun système de fichiers partagé requis)
+    import httpx
+    temp_path = f"{output_path}.part"
+    with httpx.stream("POST", f"{TTS_API_URL}/tts/stream", json={"text": summary},
+                      timeout=TTS_TIMEOUT_SECONDS) as response:
+        response.raise_for_status()
+        with open(temp_path, "wb") as f:
+            for chunk in response.iter_bytes():
+                f.write(chunk)
+    os.replace(temp_path, output_path)
+
+def run_pipeline(audio_id: str, audio_ext: str) -> Dict[str, str]:
+    """Enchaîne les trois étapes ; les fichiers ne sont écrits qu'en tant que résultats finaux."""
+    from transcription import transcribe_file, AUDIO_UPLOAD_DIR
+    from resume import generate_summary
+
+    output_dir = os.path.join(OUTPUT_BASE_DIR, audio_id)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        "transcription": os.path.join(output_dir, TRANSCRIPTION_FILENAME),
+        "summary": os.path.join(output_dir, RESUME_FILENAME),
+        "audio": os.path.join(output_dir, AUDIO_RESUME_FILENAME),
+    }
+
+    logging.info(f"🚀 Pipeline {audio_id} : transcription")
+    text = transcribe_file(os.path.join(AUDIO_UPLOAD_DIR, f"{audio_id}.{audio_ext}"))["text"]
+    _write_text(paths["transcription"], text)
+
+    logging.info(f"🚀 Pipeline {audio_id} : résumé")
+    summary = generate_summary(text)
+    _write_text(paths["summary"], summary)
+
+    logging.info(f"🚀 Pipeline {audio_id} : synthèse vocale")
+    synthesize_summary(audio_id, summary, paths["audio"])
+
+    logging.info(f"✅ Pipeline {audio_id} terminé")
+    return paths
+
+class PipelineHandler(socketserver.StreamRequestHandler):
+    """Une requête JSON par ligne, une réponse JSON par ligne."""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            result = run_pipeline(request["audio_id"], request["audio_ext"])
+            response = {"ok": True, "result": result}
+        except FileNotFoundError as e:
+            response = {"ok": False, "error": str(e), "code": 2}
+        except Exception as e:
+            logging.error(f"🚨 Erreur du pipeline : {e}")
+            response = {"ok": False, "error": str(e), "code": 3}
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+class PipelineServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def warm_up():
+    """Charge les modèles avant d'accepter des requêtes."""
+    try:
+        import asr_backends
+        asr_backends.preload()
+    except Exception as e:
+        logging.warning(f"⚠️ Préchargement Whisper ignoré : {e}")
+    try:
+        from resume import get_nlp
+        get_nlp()
+    except Exception as e:
+        logging.warning(f"⚠️ Préchargement Spacy ignoré : {e}")
+    if importlib.util.find_spec("TTS") is None:
+        logging.info("🔹 Coqui TTS absent : la synthèse passera par le service TTS")
+        return
+    try:
+        from tts_engine import get_engine
+        get_engine().load()
+    except Exception as e:
+        logging.warning(f"⚠️ Préchargement TTS ignoré : {e}")
+
+def serve(socket_path: str = PIPELINE_SOCKET):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    warm_up()
+    with PipelineServer(socket_path, PipelineHandler) as server:
+        os.chmod(socket_path, 0o660)
+        logging.info(f"🟢 Démon du pipeline à l'écoute sur {socket_path}")
+        server.serve_forever()
+
+def submit(audio_id: str, audio_ext: str, socket_path: str = PIPELINE_SOCKET) -> Dict[str, Any]:
+    """Envoie un traitement au démon et attend sa réponse."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps({"audio_id": audio_id, "audio_ext": audio_ext}).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+def main():
+    if len(sys.argv) == 2 and sys.argv[1] == "serve":
+        serve()
+        return
+
+    if len(sys.argv) != 3:
+        logging.error("❌ Utilisation : python pipeline.py serve | python pipeline.py <audio_id> <extension>")
+        sys.exit(1)
+
+    audio_id, audio_ext = sys.argv[1], sys.argv[2].lstrip(".")
+    try:
+        response = submit(audio_id, audio_ext)
+    except (FileNotFoundError, ConnectionRefusedError):
+        # Pas de démon : exécution sur place (un seul interpréteur pour les trois étapes)
+        logging.info("🔹 Démon indisponible, exécution dans ce processus")
+        try:
+            response = {"ok": True, "result": run_pipeline(audio_id, audio_ext)}
+        except FileNotFoundError as e:
+            response = {"ok": False, "error": str(e), "code": 2}
+        except Exception as e:
+            response = {"ok": False, "error": str(e), "code": 3}
+
+    if not response["ok"]:
+        logging.error(response["error"])
+        sys.exit(response["code"])
+    logging.info(f"✅ Terminé : {json.dumps(response['result'], ensure_ascii=False)}")
+
+if __name__ == "__main__":
+    main()
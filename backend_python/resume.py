@@ -1,10 +1,14 @@
 import os
 import sys
+import json
 import logging
-import spacy
-import ollama
 import gc
+import asyncio
+import threading
 from download_models import SPACY_MODEL
+from ollama_client import get_client, AsyncOllamaClient, OllamaError
+from disk_cache import DiskLRUCache, hash_text
+from metrics import span
 
 # Configuration des chemins
 BASE_DIR = "static/file"
@@ -14,22 +18,72 @@ MIN_CHUNK_SIZE = 512
 MAX_CHUNK_SIZE = 2048
 TARGET_CHUNK_SIZE = 1024
 
+# Configuration Ollama / map-reduce
+OLLAMA_CHAT_MODEL = "mistral:7b"
+OLLAMA_CONCURRENCY = int(os.getenv("OLLAMA_CONCURRENCY", "4"))
+SUMMARY_TARGET_TOKENS = int(os.getenv("SUMMARY_TARGET_TOKENS", str(TARGET_CHUNK_SIZE)))
+MAX_REDUCE_DEPTH = 5
+
+# Résumé incrémental (réunions en direct) : état par audio, taille de chunk fixe pour des frontières stables
+SUMMARY_STATE_FILENAME = "summary_state.json"
+INCREMENTAL_CHUNK_SIZE = int(os.getenv("INCREMENTAL_CHUNK_SIZE", str(TARGET_CHUNK_SIZE)))
+MIN_SUMMARY_TOKENS = 500
+
+# Cache des résumés de chunks (la clé inclut prompt et modèle : un changement de prompt invalide le cache)
+SUMMARY_CACHE_DIR = os.getenv("SUMMARY_CACHE_DIR", "static/cache/summary")
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+summary_cache = DiskLRUCache(SUMMARY_CACHE_DIR, SUMMARY_CACHE_MAX_BYTES, name="summary")
+
+SYSTEM_PROMPT = "Tu es un expert en résumé de texte en français."
+SUMMARY_PROMPT = (
+    "Fais un résumé détaillé de ce texte en incluant toutes les informations importantes, "
+    "y compris les noms propres, dates, chiffres et mots-clés. Le résumé doit faire environ 25% du texte original "
+    "et il doit être en français : {text}"
+)
+REDUCE_PROMPT = (
+    "Voici plusieurs résumés partiels d'un même document, dans l'ordre. Fusionne-les en un seul résumé "
+    "cohérent, sans répétitions, en conservant les noms propres, dates, chiffres et mots-clés. "
+    "Le résumé doit être en français : {text}"
+)
+
 # Logger
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
-# Initialiser Spacy avec le modèle préchargé
-try:
-    nlp = spacy.load(SPACY_MODEL)
-except OSError:
-    logging.error(f"❌ Modèle Spacy ({SPACY_MODEL}) non trouvé. Exécutez d'abord download_models.py")
-    sys.exit(1)
+# Modèle Spacy chargé au premier usage (l'import du module reste instantané)
+_nlp = None
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    """Retourne le pipeline Spacy, chargé une seule fois."""
+    global _nlp
+    with _nlp_lock:
+        if _nlp is None:
+            import spacy
+            try:
+                # Seul le tokenizer est utilisé : inutile de charger tagger, parser et NER
+                _nlp = spacy.load(SPACY_MODEL, exclude=["tok2vec", "morphologizer", "tagger", "parser", "senter",
+                                                        "attribute_ruler", "lemmatizer", "ner"])
+            except OSError as e:
+                raise RuntimeError(f"❌ Modèle Spacy ({SPACY_MODEL}) non trouvé. Exécutez d'abord download_models.py") from e
+        return _nlp
+
+# Ponctuation de fin de phrase / de pause utilisée pour couper les chunks
+SENTENCE_END = {".", "!", "?", "…"}
+CLAUSE_END = {",", ";", ":"}
+
+def nlp_loaded() -> bool:
+    return _nlp is not None
+
+def tokenize(text: str):
+    """Tokenisation seule (sans tagger, parser ni NER) : une seule passe par document."""
+    with span("tokenization"):
+        return get_nlp().tokenizer(text)
 
 def count_tokens(text: str) -> int:
-    return len(nlp(text))
+    return len(tokenize(text))
 
-def calculate_optimal_chunk_size(text: str) -> int:
-    """Calcule la taille optimale des chunks en fonction de la longueur du texte"""
-    total_tokens = count_tokens(text)
+def calculate_optimal_chunk_size(total_tokens: int) -> int:
+    """Calcule la taille optimale des chunks (en tokens) en fonction de la longueur du texte"""
     if total_tokens < MIN_CHUNK_SIZE:
         return total_tokens
     elif total_tokens > MAX_CHUNK_SIZE * 10:  # Pour les très longs textes
@@ -37,80 +91,257 @@ def calculate_optimal_chunk_size(text: str) -> int:
     else:
         return min(max(MIN_CHUNK_SIZE, total_tokens // 10), MAX_CHUNK_SIZE)
 
-def split_text(text: str) -> list[str]:
-    """Divise le texte en chunks de taille optimale"""
-    chunk_size = calculate_optimal_chunk_size(text)
+def split_text(text: str, doc=None) -> list[str]:
+    """Divise le texte en chunks d'au plus chunk_size tokens, coupés en fin de phrase si possible"""
+    doc = doc if doc is not None else tokenize(text)
+    chunk_size = max(1, calculate_optimal_chunk_size(len(doc)))
     sections = []
+    for char_start, char_end in chunk_bounds(text, doc, chunk_size):
+        section = text[char_start:char_end].strip()
+        if section:
+            sections.append(section)
+    return sections
+
+def chunk_bounds(text: str, doc, chunk_size: int) -> list[tuple[int, int]]:
+    """Offsets caractères (début, fin) des chunks de `text`, coupés en fin de phrase si possible"""
+    n_tokens = len(doc)
+    bounds = []
     start = 0
-    
-    while start < len(text):
-        end = min(start + chunk_size, len(text))
-        # Chercher le dernier point ou la dernière virgule dans la fenêtre
-        last_dot = text.rfind('.', start, end)
-        last_comma = text.rfind(',', start, end)
-        last_break = max(last_dot, last_comma)
-        
-        if last_break != -1:
-            end = last_break + 1
-        sections.append(text[start:end].strip())
+
+    while start < n_tokens:
+        end = min(start + chunk_size, n_tokens)
+        if end < n_tokens:
+            # Chercher la dernière fin de phrase, à défaut la dernière virgule, dans la fenêtre
+            last_sentence = last_clause = -1
+            for i in range(end - 1, start, -1):
+                token_text = doc[i].text
+                if token_text in SENTENCE_END:
+                    last_sentence = i
+                    break
+                if last_clause == -1 and token_text in CLAUSE_END:
+                    last_clause = i
+            last_break = last_sentence if last_sentence != -1 else last_clause
+            if last_break != -1:
+                end = last_break + 1
+
+        # Les offsets caractères viennent directement des tokens
+        char_start = doc[start].idx
+        char_end = doc[end].idx if end < n_tokens else len(text)
+        bounds.append((char_start, char_end))
         start = end
-    
-    return sections
 
-def summarize_chunk(chunk: str) -> str:
+    return bounds
+
+def build_messages(text: str, prompt: str = SUMMARY_PROMPT) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt.format(text=text)},
+    ]
+
+def summary_cache_key(messages: list[dict], model: str = OLLAMA_CHAT_MODEL) -> str:
+    return hash_text(model, *(f"{m['role']}:{m['content']}" for m in messages))
+
+def summarize_chunk(chunk: str, prompt: str = SUMMARY_PROMPT) -> str:
+    messages = build_messages(chunk, prompt)
+    key = summary_cache_key(messages)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return cached["summary"]
     try:
-        response = ollama.chat(model="mistral:7b", messages=[
-            {"role": "system", "content": "Tu es un expert en résumé de texte en français."},
-            {"role": "user", "content": (
-                "Fais un résumé détaillé de ce texte en incluant toutes les informations importantes, "
-                "y compris les noms propres, dates, chiffres et mots-clés. Le résumé doit faire environ 25% du texte original "
-                f"et il doit être en français : {chunk}"
-            )}
-        ])
-        return response.get("message", {}).get("content", "")
-    except Exception as e:
+        summary = get_client().chat(OLLAMA_CHAT_MODEL, messages)
+        summary_cache.put(key, {"summary": summary})
+        return summary
+    except OllamaError as e:
         logging.error(f"❌ Erreur lors de l'utilisation d'Ollama : {e}")
-        raise RuntimeError("Erreur avec Ollama. Vérifiez que le modèle mistral:7b est bien installé via download_models.py")
+        raise RuntimeError(f"Erreur avec Ollama ({e}). Vérifiez que le modèle mistral:7b est bien installé via download_models.py") from e
 
-def summarize_file(input_path: str, output_path: str):
-    logging.info(f"📄 Lecture de {input_path}")
-    with open(input_path, "r", encoding="utf-8") as f:
-        text = f.read()
+async def summarize_chunk_async(client: AsyncOllamaClient, semaphore: asyncio.Semaphore,
+                                chunk: str, prompt: str = SUMMARY_PROMPT) -> str:
+    """Version asynchrone de summarize_chunk, limitée par le sémaphore partagé."""
+    messages = build_messages(chunk, prompt)
+    key = summary_cache_key(messages)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return cached["summary"]
+    async with semaphore:
+        try:
+            summary = await client.chat(OLLAMA_CHAT_MODEL, messages)
+            # Écriture (et éventuelle éviction) hors de la boucle d'événements
+            await asyncio.to_thread(summary_cache.put, key, {"summary": summary})
+            return summary
+        except OllamaError as e:
+            logging.error(f"❌ Erreur lors de l'utilisation d'Ollama : {e}")
+            raise RuntimeError(f"Erreur avec Ollama ({e}). Vérifiez que le modèle mistral:7b est bien installé via download_models.py") from e
+
+def group_summaries(summaries: list[str], max_tokens: int = MAX_CHUNK_SIZE) -> list[list[str]]:
+    """Regroupe les résumés consécutifs par paquets tenant dans le contexte (au moins 2 par paquet)."""
+    groups, current, current_tokens = [], [], 0
+    for summary in summaries:
+        tokens = count_tokens(summary)
+        if len(current) >= 2 and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        # Un résumé isolé en fin de liste est rattaché au paquet précédent
+        if len(current) == 1 and groups:
+            groups[-1].extend(current)
+        else:
+            groups.append(current)
+    return groups
+
+async def map_chunks(client: AsyncOllamaClient, semaphore: asyncio.Semaphore, chunks: list[str]) -> list:
+    """Map : résume tous les chunks en parallèle ; None pour un chunk en échec."""
+    results = await asyncio.gather(
+        *(summarize_chunk_async(client, semaphore, chunk) for chunk in chunks),
+        return_exceptions=True,
+    )
+    summaries = []
+    for idx, result in enumerate(results):
+        if isinstance(result, Exception):
+            logging.error(f"❌ Échec du résumé du chunk {idx + 1} : {result}")
+            summaries.append(None)
+        else:
+            summaries.append(result)
+    return summaries
+
+async def reduce_summaries(client: AsyncOllamaClient, semaphore: asyncio.Semaphore, summaries: list[str],
+                           target_tokens: int = SUMMARY_TARGET_TOKENS) -> str:
+    """Reduce : résumés de résumés, niveau par niveau, jusqu'à la taille cible."""
+    if not summaries:
+        # Tous les chunks ont échoué : un résumé vide ne doit être ni écrit ni mémorisé
+        raise RuntimeError("Aucun morceau n'a pu être résumé. Vérifiez qu'Ollama est disponible")
+    depth = 0
+    while len(summaries) > 1 and depth < MAX_REDUCE_DEPTH:
+        if count_tokens("\n".join(summaries)) <= target_tokens:
+            break
+        depth += 1
+        groups = group_summaries(summaries)
+        logging.info(f"🔁 Réduction niveau {depth} : {len(summaries)} résumés → {len(groups)}")
+        summaries = list(await asyncio.gather(
+            *(summarize_chunk_async(client, semaphore, "\n".join(group), REDUCE_PROMPT) for group in groups)
+        ))
+    return "\n".join(summaries)
 
-    token_count = count_tokens(text)
+async def map_reduce_summary(chunks: list[str], concurrency: int = OLLAMA_CONCURRENCY,
+                             target_tokens: int = SUMMARY_TARGET_TOKENS) -> str:
+    """Résume les chunks en parallèle puis réduit hiérarchiquement jusqu'à la taille cible."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    # Un seul pool de connexions keep-alive pour toutes les requêtes du résumé
+    async with AsyncOllamaClient() as client:
+        summaries = [s for s in await map_chunks(client, semaphore, chunks) if s]
+        return await reduce_summaries(client, semaphore, summaries, target_tokens)
+
+def _state_fingerprint() -> str:
+    # Changer de modèle, de prompt ou de taille de chunk invalide l'état incrémental
+    return hash_text(OLLAMA_CHAT_MODEL, SUMMARY_PROMPT, str(INCREMENTAL_CHUNK_SIZE))
+
+def load_summary_state(state_path: str) -> dict:
+    empty = {"fingerprint": _state_fingerprint(), "chunks": []}
+    if not os.path.isfile(state_path):
+        return empty
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"⚠️ État du résumé illisible ({state_path}), reprise depuis le début : {e}")
+        return empty
+    return state if state.get("fingerprint") == empty["fingerprint"] else empty
+
+def save_summary_state(state_path: str, state: dict):
+    temp_path = f"{state_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(temp_path, state_path)
+
+async def incremental_summary(text: str, state: dict, concurrency: int = OLLAMA_CONCURRENCY,
+                              target_tokens: int = SUMMARY_TARGET_TOKENS) -> str:
+    """Met à jour `state` (chunks et leurs résumés) pour `text` et retourne le résumé final.
+
+    Seuls les chunks de fin nouveaux ou modifiés sont retokenisés et résumés ; la réduction
+    est relancée sur l'ensemble des résumés (les paquets inchangés sont servis par le cache).
+    """
+    # Chunks conservés : texte inchangé et résumé disponible. Le dernier est toujours recalculé,
+    # il a pu être coupé par la fin du texte précédent.
+    kept = []
+    for chunk in state["chunks"][:-1]:
+        if chunk["summary"] is None or hash_text(text[chunk["start"]:chunk["end"]]) != chunk["hash"]:
+            break
+        kept.append(chunk)
+
+    offset = kept[-1]["end"] if kept else 0
+    tail = text[offset:]
+    doc = tokenize(tail)
+    if not kept and len(doc) < MIN_SUMMARY_TOKENS:
+        logging.info("🔹 Texte trop court, pas de résumé généré.")
+        state["chunks"] = []
+        return text
+
+    bounds = [(offset + start, offset + end) for start, end in chunk_bounds(tail, doc, INCREMENTAL_CHUNK_SIZE)]
+    logging.info(f"🧩 {len(kept)} morceaux conservés, {len(bounds)} à résumer")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    async with AsyncOllamaClient() as client:
+        summaries = await map_chunks(client, semaphore, [text[start:end].strip() for start, end in bounds])
+        new_chunks = [
+            {"start": start, "end": end, "hash": hash_text(text[start:end]), "summary": summary}
+            for (start, end), summary in zip(bounds, summaries)
+        ]
+        state["chunks"] = kept + new_chunks
+        return await reduce_summaries(client, semaphore, [c["summary"] for c in state["chunks"] if c["summary"]],
+                                      target_tokens)
+
+def generate_summary(text: str) -> str:
+    """Résume un texte en mémoire et retourne le résumé."""
+    doc = tokenize(text)
+    token_count = len(doc)
     logging.info(f"📊 {token_count} tokens détectés.")
 
-    if token_count < 500:
+    if token_count < MIN_SUMMARY_TOKENS:
         logging.info("🔹 Texte trop court, pas de résumé généré.")
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(text)
-        return
+        return text
 
-    chunks = split_text(text)
+    chunks = split_text(text, doc)
     logging.info(f"🧩 {len(chunks)} morceaux à résumer")
 
-    summaries = []
-    for idx, chunk in enumerate(chunks):
-        try:
-            logging.info(f"📝 Résumé du chunk {idx + 1}/{len(chunks)}")
-            summary = summarize_chunk(chunk)
-            summaries.append(summary)
-            # Nettoyage de la mémoire après chaque chunk
-            gc.collect()
-        except Exception as e:
-            logging.error(f"❌ Échec du résumé du chunk {idx + 1} : {e}")
-
-    final_summary = "\n".join(summaries)
+    summary = asyncio.run(map_reduce_summary(chunks))
+    stats = summary_cache.stats()
+    logging.info(f"♻️ Cache des résumés : {stats['hits']} hits, {stats['misses']} misses")
+    gc.collect()
+    return summary
+
+def summarize_file(input_path: str, output_path: str):
+    logging.info(f"📄 Lecture de {input_path}")
+    with open(input_path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    final_summary = generate_summary(text)
     with open(output_path, "w", encoding="utf-8") as f:
         f.write(final_summary)
     logging.info(f"✅ Résumé généré dans {output_path}")
 
+def summarize_file_incremental(input_path: str, output_path: str, state_path: str):
+    """Comme summarize_file, pour une transcription qui grandit : seul le texte ajouté est résumé."""
+    logging.info(f"📄 Lecture de {input_path}")
+    with open(input_path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    state = load_summary_state(state_path)
+    final_summary = asyncio.run(incremental_summary(text, state))
+    save_summary_state(state_path, state)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(final_summary)
+    logging.info(f"✅ Résumé mis à jour dans {output_path}")
+
 def main():
-    if len(sys.argv) != 2:
-        logging.error("❌ Usage : python summarizer.py <user_id>")
+    incremental = "--incremental" in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != "--incremental"]
+    if len(args) != 1:
+        logging.error("❌ Usage : python summarizer.py <user_id> [--incremental]")
         sys.exit(1)
 
-    user_id = sys.argv[1]
+    user_id = args[0]
     user_dir = os.path.join(BASE_DIR, user_id)
     input_file = os.path.join(user_dir, TRANSCRIPTION_FILENAME)
     output_file = os.path.join(user_dir, RESUME_FILENAME)
@@ -120,7 +351,10 @@ def main():
         sys.exit(2)
 
     try:
-        summarize_file(input_file, output_file)
+        if incremental:
+            summarize_file_incremental(input_file, output_file, os.path.join(user_dir, SUMMARY_STATE_FILENAME))
+        else:
+            summarize_file(input_file, output_file)
     except Exception as e:
         logging.error(f"🚨 Erreur lors du résumé : {e}")
         sys.exit(3)
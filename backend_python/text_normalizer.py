@@ -0,0 +1,114 @@
+import re
+import sys
+import time
+import logging
+from functools import lru_cache
+from num2words import num2words
+
+# Normalisation du texte français avant la synthèse vocale : une seule passe regex
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+MONTHS = [
+    "janvier", "février", "mars", "avril", "mai", "juin",
+    "juillet", "août", "septembre", "octobre", "novembre", "décembre",
+]
+UNITS = {
+    "km²": "kilomètres carrés",
+    "m²": "mètres carrés",
+    "%": "pour cent",
+    "€": "euros",
+}
+# Espaces utilisées comme séparateur de milliers (espace, insécable, fine insécable)
+THOUSANDS_SEP = " \u00a0\u202f"
+
+_UNIT_PATTERN = "|".join(re.escape(unit) for unit in UNITS)
+
+# Table unique : chaque alternative nommée correspond à un type de token
+# (le groupe englobant se ferme en dernier, donc match.lastgroup désigne le type)
+TOKEN_PATTERN = re.compile(
+    rf"(?P<date>\b(?P<day>\d{{1,2}})/(?P<month>\d{{1,2}})/(?P<year>\d{{4}})\b)"
+    rf"|(?P<ordinal>\b(?P<ord_value>\d+)(?P<ord_suffix>ère|re|er|ème|eme|e)\b)"
+    rf"|(?P<number>(?P<int_part>\b\d{{1,3}}(?:[{THOUSANDS_SEP}]\d{{3}})+(?!\d)|\d+)"
+    rf"(?:[,.](?P<frac_part>\d+))?(?P<unit>[{THOUSANDS_SEP}]?(?:{_UNIT_PATTERN}))?)"
+    rf"|(?P<unit_only>{_UNIT_PATTERN})"
+)
+
+@lru_cache(maxsize=4096)
+def cardinal(value: int) -> str:
+    return num2words(value, lang="fr")
+
+@lru_cache(maxsize=512)
+def ordinal(value: int, feminine: bool = False) -> str:
+    if value == 1:
+        return "première" if feminine else "premier"
+    return num2words(value, lang="fr", to="ordinal")
+
+def _fraction(digits: str) -> str:
+    # Les zéros de tête se prononcent : 0,05 → zéro virgule zéro cinq
+    stripped = digits.lstrip("0")
+    zeros = ["zéro"] * (len(digits) - len(stripped))
+    return " ".join(zeros + ([cardinal(int(stripped))] if stripped else []))
+
+def _date(match: re.Match) -> str:
+    day, month, year = int(match["day"]), int(match["month"]), int(match["year"])
+    if not (1 <= day <= 31 and 1 <= month <= 12):
+        return " ".join(cardinal(int(match[g])) for g in ("day", "month", "year"))
+    day_words = "premier" if day == 1 else cardinal(day)
+    return f"{day_words} {MONTHS[month - 1]} {cardinal(year)}"
+
+def _ordinal(match: re.Match) -> str:
+    return ordinal(int(match["ord_value"]), feminine=match["ord_suffix"] in ("ère", "re"))
+
+def _number(match: re.Match) -> str:
+    int_part = re.sub(f"[{THOUSANDS_SEP}]", "", match["int_part"])
+    words = cardinal(int(int_part))
+    if match["frac_part"]:
+        words = f"{words} virgule {_fraction(match['frac_part'])}"
+    if match["unit"]:
+        words = f"{words} {UNITS[match['unit'].strip(THOUSANDS_SEP)]}"
+    return words
+
+def _unit_only(match: re.Match) -> str:
+    return UNITS[match["unit_only"]]
+
+_HANDLERS = {
+    "date": _date,
+    "ordinal": _ordinal,
+    "number": _number,
+    "unit_only": _unit_only,
+}
+
+def _dispatch(match: re.Match) -> str:
+    return _HANDLERS[match.lastgroup](match)
+
+def normalize_text(text: str) -> str:
+    """Remplace dates, ordinaux, nombres (décimaux, milliers) et unités par des mots, en une passe"""
+    return TOKEN_PATTERN.sub(_dispatch, text)
+
+def benchmark(iterations: int = 200):
+    """Micro-benchmark : normalisation d'un résumé type, comparée à l'ancienne méthode."""
+    sample = (
+        "Le 14/07/2024, la commune de 12 500 habitants a voté un budget de 3,5 millions d'euros, "
+        "soit 12 % de plus qu'en 2023. La 2e phase couvre 1 000 m² et 4,25 km². "
+    ) * 20
+
+    def legacy(text: str) -> str:
+        text = re.sub(r"\d+", lambda m: num2words(m.group(), lang="fr"), text)
+        return text.replace("km²", " kilomètres carrés").replace("m²", " mètres carrés").replace("%", " pour cent")
+
+    for name, func in (("ancienne méthode", legacy), ("normalize_text", normalize_text)):
+        func(sample)  # Préchauffage (compilation, cache)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func(sample)
+        elapsed = (time.perf_counter() - start) / iterations
+        logging.info(f"⏱️ {name} : {elapsed * 1000:.3f} ms par résumé ({len(sample)} caractères)")
+
+    logging.info(f"♻️ Cache cardinal : {cardinal.cache_info()}")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
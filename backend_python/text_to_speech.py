@@ -3,13 +3,12 @@ import re
 import sys
 import logging
 import ffmpeg
-import gc
-import tempfile
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterator
 from pydantic import BaseModel
-from TTS.api import TTS
 from num2words import num2words
-from config import TTS_MODEL, TTS_MODEL_NAME, TTS_DIR
+from config import TTS_MODEL, TTS_DIR
+from text_normalizer import normalize_text
+from tts_engine import get_engine, get_pool, write_mp3, encode_mp3_bytes
 
 # Configuration des logs
 logging.basicConfig(
@@ -17,19 +16,15 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
-WAV_TEMP_FILE = "output.wav"
 MAX_TEXT_LENGTH = 5000  # Longueur maximale du texte à synthétiser
+PARALLEL_CHUNK_LENGTH = int(os.getenv("TTS_PARALLEL_CHUNK_LENGTH", "400"))  # Taille des morceaux répartis sur le pool
+SENTENCE_PATTERN = re.compile(r"[^.!?…]+(?:[.!?…]+|$)")
 
 def convert_numbers_to_words(text: str, lang: str = "fr") -> str:
     """Remplace les chiffres et unités dans le texte par des mots"""
-    def replace_number(match):
-        return num2words(match.group(), lang=lang)
-
-    text = re.sub(r'\d+', replace_number, text)
-    text = text.replace("km²", " kilomètres carrés") \
-               .replace("m²", " mètres carrés") \
-               .replace("%", " pour cent")
-    return text
+    if lang != "fr":
+        return re.sub(r'\d+', lambda match: num2words(match.group(), lang=lang), text)
+    return normalize_text(text)
 
 def convert_to_mp3(input_wav: str, output_mp3: str):
     """Convertit un fichier WAV en MP3"""
@@ -63,71 +58,81 @@ def split_text_for_tts(text: str, max_length: int = MAX_TEXT_LENGTH) -> list[str
     
     return chunks
 
-def generate_audio(input_path: str, output_path: str):
-    """Génère un audio à partir du résumé texte"""
-    tts = None
-    try:
-        if not os.path.isfile(input_path):
-            raise FileNotFoundError(f"Fichier introuvable : {input_path}")
-
-        logging.info(f"📄 Lecture du résumé : {input_path}")
-        with open(input_path, "r", encoding="utf-8") as f:
-            text = f.read()
+def split_sentences(text: str, max_length: int = MAX_TEXT_LENGTH) -> list[str]:
+    """Découpe le texte en phrases (les phrases trop longues sont redécoupées)"""
+    sentences = []
+    for match in SENTENCE_PATTERN.finditer(text):
+        sentence = match.group().strip()
+        if sentence:
+            sentences.extend(split_text_for_tts(sentence, max_length))
+    return sentences
+
+def group_sentences(sentences: list[str], max_length: int = PARALLEL_CHUNK_LENGTH) -> list[str]:
+    """Regroupe les phrases consécutives en morceaux d'environ max_length caractères"""
+    chunks, current = [], ""
+    for sentence in sentences:
+        if current and len(current) + len(sentence) + 1 > max_length:
+            chunks.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
 
-        # Nettoyage du texte
-        cleaned_text = convert_numbers_to_words(text)
-        
+def stream_tts_audio(text: str) -> Iterator[bytes]:
+    """Synthétise le texte phrase par phrase et produit chaque morceau MP3 dès qu'il est prêt."""
+    sentences = split_sentences(convert_numbers_to_words(text))
+    logging.info(f"📝 Synthèse en streaming de {len(sentences)} phrases")
+
+    pool = get_pool()
+    if pool is not None:
+        # Les workers du pool synthétisent les phrases suivantes pendant l'envoi de la courante
+        for samples, sample_rate in pool.synthesize_stream(sentences):
+            yield encode_mp3_bytes(samples, sample_rate)
+        return
+
+    engine = get_engine()
+    for sentence in sentences:
+        yield encode_mp3_bytes(engine.synthesize(sentence), engine.sample_rate)
+
+def generate_tts_audio(text: str, output_path: str) -> str:
+    """Synthétise un texte en MP3 avec le moteur TTS résident (aucun fichier temporaire)."""
+    # Nettoyage du texte
+    cleaned_text = convert_numbers_to_words(text)
+
+    pool = get_pool()
+    if pool is not None:
+        # Morceaux plus petits pour occuper tous les workers du pool
+        text_chunks = group_sentences(split_sentences(cleaned_text))
+        logging.info(f"📝 Texte divisé en {len(text_chunks)} morceaux répartis sur {pool.workers} workers")
+        samples, sample_rate = pool.synthesize_chunks(text_chunks)
+    else:
         # Division du texte si nécessaire
         text_chunks = split_text_for_tts(cleaned_text)
         logging.info(f"📝 Texte divisé en {len(text_chunks)} morceaux")
+        engine = get_engine()
+        samples, sample_rate = engine.synthesize_chunks(text_chunks), engine.sample_rate
 
-        # Chargement du modèle
-        tts = TTS(model_name=TTS_MODEL_NAME).to("cpu")
-
-        # Sélection dynamique d'un locuteur et langue
-        speaker = tts.speakers[0] if tts.speakers else None
-        language = "fr" if "fr" in tts.languages else tts.languages[0]
+    # Synthèse en mémoire puis un seul encodage MP3
+    write_mp3(samples, sample_rate, output_path)
 
-        if speaker is None:
-            raise RuntimeError("Aucun locuteur disponible pour ce modèle TTS.")
+    logging.info(f"✅ Audio sauvegardé : {output_path}")
+    return output_path
 
-        # Génération audio pour chaque chunk
-        temp_files = []
-        for i, chunk in enumerate(text_chunks):
-            chunk_wav = f"temp_chunk_{i}.wav"
-            logging.info(f"🎙️ Synthèse vocale du morceau {i+1}/{len(text_chunks)}...")
-            tts.tts_to_file(text=chunk, speaker=speaker, language=language, file_path=chunk_wav)
-            temp_files.append(chunk_wav)
-
-        # Concaténation des fichiers audio
-        if len(temp_files) > 1:
-            logging.info("🔄 Concaténation des fichiers audio...")
-            inputs = [ffmpeg.input(f) for f in temp_files]
-            ffmpeg.concat(*inputs, v=0, a=1).output(WAV_TEMP_FILE).run(overwrite_output=True)
-        else:
-            os.rename(temp_files[0], WAV_TEMP_FILE)
-
-        # Conversion en MP3
-        convert_to_mp3(WAV_TEMP_FILE, output_path)
+def generate_audio(input_path: str, output_path: str):
+    """Génère un audio à partir du résumé texte"""
+    if not os.path.isfile(input_path):
+        raise FileNotFoundError(f"Fichier introuvable : {input_path}")
 
-        logging.info(f"✅ Audio résumé sauvegardé : {output_path}")
+    logging.info(f"📄 Lecture du résumé : {input_path}")
+    with open(input_path, "r", encoding="utf-8") as f:
+        text = f.read()
 
+    try:
+        generate_tts_audio(text, output_path)
     except Exception as e:
         logging.error(f"❌ Erreur lors de la génération audio : {e}")
-        raise RuntimeError("Erreur avec TTS. Vérifiez que le modèle est bien installé via download_models.py")
-
-    finally:
-        # Nettoyage
-        if tts is not None:
-            del tts
-            gc.collect()
-        
-        # Suppression des fichiers temporaires
-        for temp_file in temp_files:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-        if os.path.exists(WAV_TEMP_FILE):
-            os.remove(WAV_TEMP_FILE)
+        raise RuntimeError("Erreur avec TTS. Vérifiez que le modèle est bien installé via download_models.py") from e
 
 def main():
     if len(sys.argv) != 2:
@@ -1,18 +1,57 @@
 import os
 import logging
-import whisper
-import spacy
 import ffmpeg
-import gc
 import sys
-from typing import Dict, Any, Optional
+import numpy as np
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Iterator
 from pydantic import BaseModel
-from download_models import MODEL_DIR, WHISPER_MODEL_SIZE
+from download_models import WHISPER_MODEL_SIZE
+from asr_backends import ASRBackend, get_backend
+from audio_utils import find_silence_splits, quietest_point, speech_spans, compact_speech, to_original_time
+from disk_cache import DiskLRUCache, hash_file
+from metrics import span
 
 # Configuration
 AUDIO_UPLOAD_DIR = "static/upload/audio"
 OUTPUT_BASE_DIR = "static/file"
 SUPPORTED_FORMATS = ['.mp3', '.wav', '.m4a', '.ogg', '.flac']
+SAMPLE_RATE = 16000
+# Écrit aussi le WAV intermédiaire sur disque (debug uniquement)
+WRITE_DEBUG_WAV = os.getenv("WRITE_DEBUG_WAV", "0") == "1"
+# Taille des fenêtres pour la transcription en streaming (secondes)
+STREAM_WINDOW_SECONDS = int(os.getenv("STREAM_WINDOW_SECONDS", "30"))
+# Chaque fenêtre est coupée au point le plus calme de ses dernières secondes (pas au milieu d'un mot)
+STREAM_CUT_SEARCH_SECONDS = float(os.getenv("STREAM_CUT_SEARCH_SECONDS", "5"))
+# Transcription parallèle des longs fichiers (0 = désactivée)
+PARALLEL_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "0"))
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", "2"))
+PARALLEL_MIN_SECONDS = int(os.getenv("PARALLEL_MIN_SECONDS", "300"))
+PARALLEL_OVERLAP_SECONDS = 1.0
+# Suppression des silences avant Whisper (détection de parole par énergie)
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") == "1"
+
+# Transcription par lots de clips courts
+BATCH_SIZE = int(os.getenv("TRANSCRIBE_BATCH_SIZE", "16"))
+BATCH_DECODE_THREADS = int(os.getenv("BATCH_DECODE_THREADS", "4"))
+BATCH_MAX_CLIP_SECONDS = 30  # Fenêtre native de l'encodeur Whisper
+# Suffixe des résultats du mode lot (texte sans horodatage) dans le cache des transcriptions
+BATCH_CACHE_SUFFIX = "-batch"
+
+# Cache des transcriptions, adressé par le contenu audio
+TRANSCRIPTION_LANGUAGE = "fr"
+TRANSCRIPTION_CACHE_DIR = os.getenv("TRANSCRIPTION_CACHE_DIR", "static/cache/transcription")
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+transcription_cache = DiskLRUCache(TRANSCRIPTION_CACHE_DIR, TRANSCRIPTION_CACHE_MAX_BYTES, name="transcription")
+
+# Pool de processus partagé (un modèle résident par worker), recréé si sa configuration change
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_config: Optional[tuple] = None
+_pool_lock = threading.Lock()
+_worker_backend: Optional[ASRBackend] = None
+_worker_model_size: Optional[str] = None
 
 # Logging
 logging.basicConfig(
@@ -38,46 +77,354 @@ def convert_to_wav(input_path: str, output_path: str):
         logging.error(f"❌ Erreur de conversion : {e}")
         raise
 
-def transcribe_audio(audio_id: str, audio_ext: str) -> str:
-    """Transcrire un fichier audio avec Whisper et sauvegarder le texte."""
-    model = None
+def decode_audio(input_path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Décode un fichier audio en mémoire (PCM mono float32), sans fichier WAV intermédiaire."""
+    if not check_audio_format(input_path):
+        raise ValueError(f"Format audio non supporté. Formats acceptés : {', '.join(SUPPORTED_FORMATS)}")
+
+    logging.info(f"🎧 Décodage en mémoire : {input_path}")
     try:
-        # Chemins dynamiques
-        input_audio_path = os.path.join(AUDIO_UPLOAD_DIR, f"{audio_id}.{audio_ext}")
-        output_dir = os.path.join(OUTPUT_BASE_DIR, audio_id)
-        os.makedirs(output_dir, exist_ok=True)
-        wav_output_path = os.path.join(output_dir, f"{audio_id}.wav")
-        transcription_output_path = os.path.join(output_dir, "transcription.txt")
-
-        # Vérification du fichier source
-        if not os.path.isfile(input_audio_path):
-            raise FileNotFoundError(f"❌ Fichier introuvable : {input_audio_path}")
-
-        # Étape 1 : conversion en WAV
-        convert_to_wav(input_audio_path, wav_output_path)
-
-        # Étape 2 : transcription
-        logging.info(f"🧠 Chargement du modèle Whisper ({WHISPER_MODEL_SIZE})...")
-        model_path = os.path.join(MODEL_DIR, WHISPER_MODEL_SIZE + ".pt")
-        if not os.path.isfile(model_path):
-            raise FileNotFoundError(f"❌ Modèle Whisper non trouvé à {model_path}. Exécutez d'abord download_models.py")
-
-        model = whisper.load_model(WHISPER_MODEL_SIZE, download_root=MODEL_DIR)
-        
-        logging.info(f"✍️ Transcription en cours de {wav_output_path}...")
-        result = model.transcribe(wav_output_path, language="fr")
-
-        with open(transcription_output_path, "w", encoding="utf-8") as f:
-            f.write(result["text"])
-
-        logging.info(f"✅ Transcription enregistrée : {transcription_output_path}")
-        return transcription_output_path
-
-    finally:
-        # Nettoyage de la mémoire
-        if model is not None:
-            del model
-            gc.collect()
+        with span("decode"):
+            out, _ = (
+                ffmpeg.input(input_path, threads=0)
+                .output("-", format="s16le", acodec="pcm_s16le", ac=1, ar=sample_rate)
+                .run(cmd=["ffmpeg", "-nostdin"], capture_stdout=True, capture_stderr=True)
+            )
+    except ffmpeg.Error as e:
+        logging.error(f"❌ Erreur de décodage : {e.stderr.decode(errors='ignore') if e.stderr else e}")
+        raise
+
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+def _init_worker(backend_name: str, model_size: str, torch_threads: int):
+    """Initialise un worker : limite les threads torch et charge son propre modèle."""
+    global _worker_backend, _worker_model_size
+    import torch
+    torch.set_num_threads(torch_threads)
+    _worker_backend, _worker_model_size = get_backend(backend_name), model_size
+    _worker_backend.load(model_size)
+
+def _transcribe_part(audio: np.ndarray, offset: float) -> Dict[str, Any]:
+    result = _worker_backend.transcribe(audio, _worker_model_size, language=TRANSCRIPTION_LANGUAGE)
+    segments = [
+        {"start": offset + seg["start"], "end": offset + seg["end"], "text": seg["text"].strip()}
+        for seg in result.get("segments", [])
+    ]
+    return {"offset": offset, "segments": segments}
+
+def _get_pool(backend: ASRBackend, model_size: str, workers: int, torch_threads: int) -> ProcessPoolExecutor:
+    """Pool dont les workers ont chargé le modèle du moteur ; un changement de configuration le recrée."""
+    global _pool, _pool_config
+    config = (backend.name, model_size, workers, torch_threads)
+    with _pool_lock:
+        if _pool is not None and _pool_config != config:
+            logging.info(f"♻️ Configuration des workers modifiée ({_pool_config} → {config}), redémarrage du pool")
+            # Les parties en cours se terminent sur l'ancien pool
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            logging.info(f"⚙️ Démarrage de {workers} workers de transcription ({torch_threads} threads chacun)")
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(backend.name, model_size, torch_threads),
+            )
+            _pool_config = config
+        return _pool
+
+# Nombre maximum de mots comparés entre la fin d'une partie et le début de la suivante
+STITCH_MAX_OVERLAP_WORDS = 40
+
+def _normalize_word(word: str) -> str:
+    return word.strip(".,;:!?…«»\"'()").lower()
+
+def _repeated_prefix(previous_words: list[str], words: list[str]) -> int:
+    """Nombre de mots en tête de `words` qui répètent la fin de `previous_words`."""
+    previous = [_normalize_word(w) for w in previous_words[-STITCH_MAX_OVERLAP_WORDS:]]
+    current = [_normalize_word(w) for w in words[:STITCH_MAX_OVERLAP_WORDS]]
+    for k in range(min(len(previous), len(current)), 0, -1):
+        if previous[-k:] == current[:k]:
+            return k
+    return 0
+
+def stitch_segments(parts: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+    """Recolle les segments des différentes parties en supprimant les doublons du recouvrement.
+
+    Dans la zone de recouvrement, les mots en tête d'un segment qui répètent la fin du texte
+    déjà recollé sont retirés ; un segment entièrement répété est ignoré.
+    """
+    stitched = []
+    for part in sorted(parts, key=lambda p: p["offset"]):
+        for seg in part["segments"]:
+            if not seg["text"]:
+                continue
+            if stitched:
+                last = stitched[-1]
+                # Segment entièrement dans la partie déjà couverte
+                if seg["end"] <= last["end"]:
+                    continue
+                if seg["start"] < last["end"]:
+                    previous_words = " ".join(s["text"] for s in stitched[-3:]).split()
+                    words = seg["text"].split()
+                    words = words[_repeated_prefix(previous_words, words):]
+                    if not words:
+                        continue
+                    seg = {**seg, "start": max(seg["start"], last["end"]), "text": " ".join(words)}
+            stitched.append(seg)
+    return stitched
+
+def transcribe_parallel(audio: np.ndarray, model_size: str = WHISPER_MODEL_SIZE,
+                        workers: int = PARALLEL_WORKERS,
+                        torch_threads: int = TORCH_THREADS_PER_WORKER,
+                        backend: Optional[ASRBackend] = None) -> Dict[str, Any]:
+    """Découpe l'audio aux silences et transcrit les parties dans un pool de processus."""
+    backend = backend or get_backend()
+    workers = max(1, workers or os.cpu_count() // max(1, torch_threads))
+    bounds = [0] + find_silence_splits(audio, workers) + [len(audio)]
+    overlap = int(PARALLEL_OVERLAP_SECONDS * SAMPLE_RATE)
+
+    pool = _get_pool(backend, model_size, workers, torch_threads)
+    futures = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        part_start = max(0, start - overlap)
+        futures.append(pool.submit(_transcribe_part, audio[part_start:end], part_start / SAMPLE_RATE))
+    logging.info(f"🔀 Transcription parallèle en {len(futures)} parties")
+
+    segments = stitch_segments([f.result() for f in futures])
+    return {"text": " ".join(seg["text"] for seg in segments), "segments": segments}
+
+def trim_silence(audio: np.ndarray) -> tuple[np.ndarray, Optional[list[tuple[int, int]]]]:
+    """Ne garde que la parole ; retourne l'audio réduit et la table de correspondance (None si inchangé)."""
+    with span("vad"):
+        spans = speech_spans(audio, SAMPLE_RATE)
+    # Aucune parole détectée : Whisper reçoit l'audio complet plutôt qu'une transcription vide
+    if not spans or spans == [(0, len(audio))]:
+        return audio, None
+    speech, timeline = compact_speech(audio, spans)
+    logging.info(f"🔇 Silences retirés : {len(audio) / SAMPLE_RATE:.1f}s → {len(speech) / SAMPLE_RATE:.1f}s de parole")
+    return speech, timeline
+
+def restore_timestamps(transcription: Dict[str, Any], timeline: list[tuple[int, int]]) -> Dict[str, Any]:
+    """Replace les segments, calculés sur l'audio réduit, sur la chronologie de l'audio original."""
+    segments = [
+        {
+            "start": to_original_time(seg["start"], timeline, SAMPLE_RATE),
+            "end": to_original_time(seg["end"], timeline, SAMPLE_RATE, is_end=True),
+            "text": seg["text"],
+        }
+        for seg in transcription["segments"]
+    ]
+    return {**transcription, "segments": segments}
+
+def transcription_cache_key(input_audio_path: str, backend: ASRBackend, model_size: str) -> str:
+    """Même audio + même modèle + même langue + même prétraitement => même transcription."""
+    return hash_file(input_audio_path, backend.model_key(model_size), TRANSCRIPTION_LANGUAGE,
+                     *(["vad"] if VAD_ENABLED else []))
+
+def transcribe_file(input_audio_path: str, model_size: str = WHISPER_MODEL_SIZE,
+                    debug_wav_path: Optional[str] = None, backend: Optional[ASRBackend] = None) -> Dict[str, Any]:
+    """Transcrit un fichier audio et retourne le texte et les segments (sans rien écrire)."""
+    backend = backend or get_backend()
+    # Vérification du fichier source
+    if not os.path.isfile(input_audio_path):
+        raise FileNotFoundError(f"❌ Fichier introuvable : {input_audio_path}")
+
+    # Cache : même audio + même modèle + même langue => même transcription, sans charger Whisper
+    cache_key = transcription_cache_key(input_audio_path, backend, model_size)
+    cached = transcription_cache.get(cache_key)
+    if cached is not None:
+        logging.info(f"♻️ Transcription trouvée dans le cache : {input_audio_path}")
+        return cached
+
+    # Étape 1 : décodage en mémoire (le WAV sur disque n'est écrit qu'en mode debug)
+    audio = decode_audio(input_audio_path)
+    if WRITE_DEBUG_WAV and debug_wav_path:
+        convert_to_wav(input_audio_path, debug_wav_path)
+
+    # Étape 2 : seule la parole est transcrite, les horodatages sont ensuite recalés
+    timeline = None
+    if VAD_ENABLED:
+        audio, timeline = trim_silence(audio)
+
+    # Étape 3 : transcription (modèle partagé via le registre, chargé une seule fois)
+    logging.info(f"✍️ Transcription en cours ({len(audio) / SAMPLE_RATE:.1f}s d'audio)...")
+    if PARALLEL_WORKERS > 0 and len(audio) >= PARALLEL_MIN_SECONDS * SAMPLE_RATE:
+        with span("transcription", mode="parallel", backend=backend.name):
+            transcription = transcribe_parallel(audio, model_size, backend=backend)
+    else:
+        with span("transcription", mode="single", backend=backend.name):
+            transcription = backend.transcribe(audio, model_size, language=TRANSCRIPTION_LANGUAGE)
+    if timeline is not None:
+        transcription = restore_timestamps(transcription, timeline)
+
+    transcription_cache.put(cache_key, transcription)
+    return transcription
+
+def _decode_for_batch(input_audio_path: str):
+    if not os.path.isfile(input_audio_path):
+        raise FileNotFoundError(f"❌ Fichier introuvable : {input_audio_path}")
+    return decode_audio(input_audio_path)
+
+def _transcribe_clip_batch(model, clips: list[np.ndarray]) -> list[str]:
+    """Passe un lot de clips (complétés à 30 s) dans l'encodeur puis le décodeur en une fois."""
+    import torch
+    import whisper
+
+    n_mels = model.dims.n_mels
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(clip)), n_mels=n_mels)
+        for clip in clips
+    ]).to(model.device)
+    options = whisper.DecodingOptions(language=TRANSCRIPTION_LANGUAGE, fp16=False, without_timestamps=True)
+    with torch.no_grad():
+        results = whisper.decode(model, mels, options)
+    return [result.text.strip() for result in results]
+
+def transcribe_batch(input_audio_paths: list[str], model_size: str = WHISPER_MODEL_SIZE,
+                     batch_size: int = BATCH_SIZE, backend: Optional[ASRBackend] = None) -> list[Dict[str, Any]]:
+    """Transcrit plusieurs fichiers : décodage concurrent, lots regroupés par durée, résultats dans l'ordre.
+
+    Chaque résultat vaut {"text", "segments"} ou {"error"} si le fichier n'a pas pu être traité.
+    """
+    backend = backend or get_backend()
+    results: list[Optional[Dict[str, Any]]] = [None] * len(input_audio_paths)
+    cache_keys: Dict[int, str] = {}
+    pending = []
+
+    # Cache d'abord : les fichiers déjà connus ne sont même pas décodés. Une transcription complète
+    # (transcribe_file) convient aussi au lot ; l'inverse est faux (un seul segment, sans horodatage réel)
+    for i, path in enumerate(input_audio_paths):
+        if os.path.isfile(path):
+            cache_keys[i] = transcription_cache_key(path, backend, model_size)
+            cached = transcription_cache.get(cache_keys[i])
+            if cached is None:
+                cached = transcription_cache.get(cache_keys[i] + BATCH_CACHE_SUFFIX)
+            if cached is not None:
+                results[i] = cached
+                continue
+        pending.append(i)
+
+    # Décodage concurrent (un processus ffmpeg par fichier)
+    audios: Dict[int, np.ndarray] = {}
+    with ThreadPoolExecutor(max_workers=BATCH_DECODE_THREADS) as executor:
+        futures = {i: executor.submit(_decode_for_batch, input_audio_paths[i]) for i in pending}
+        for i, future in futures.items():
+            try:
+                audios[i] = future.result()
+            except Exception as e:
+                logging.error(f"❌ Décodage impossible de {input_audio_paths[i]} : {e}")
+                results[i] = {"error": str(e)}
+
+    # Même prétraitement que transcribe_file (la clé de cache est partagée)
+    timelines: Dict[int, Optional[list]] = {}
+    if VAD_ENABLED:
+        for i in audios:
+            audios[i], timelines[i] = trim_silence(audios[i])
+
+    max_samples = BATCH_MAX_CLIP_SECONDS * SAMPLE_RATE
+    short = sorted((i for i in audios if len(audios[i]) <= max_samples), key=lambda i: len(audios[i]))
+    long = [i for i in audios if len(audios[i]) > max_samples]
+
+    # Le modèle n'est chargé que s'il reste des clips à transcrire ; un échec ne fait pas perdre le reste du lot
+    model = model_lock = None
+    if short:
+        try:
+            model, model_lock = backend.load(model_size)
+        except (FileNotFoundError, RuntimeError) as e:
+            logging.error(f"❌ Chargement du modèle impossible : {e}")
+            for i in audios:
+                results[i] = {"error": str(e)}
+            return results
+
+    # Clips courts : triés par durée pour que chaque lot décode un nombre de tokens comparable
+    for start in range(0, len(short), batch_size):
+        indices = short[start:start + batch_size]
+        with model_lock, span("transcription", mode="batch"):
+            texts = _transcribe_clip_batch(model, [audios[i] for i in indices])
+        for i, text in zip(indices, texts):
+            duration = len(audios[i]) / SAMPLE_RATE
+            results[i] = {"text": text, "segments": [{"start": 0.0, "end": duration, "text": text}]}
+    logging.info(f"📦 {len(short)} clips courts transcrits par lots de {batch_size}")
+
+    # Fichiers longs : transcription classique par fenêtres glissantes
+    for i in long:
+        try:
+            with span("transcription", mode="single", backend=backend.name):
+                results[i] = backend.transcribe(audios[i], model_size, language=TRANSCRIPTION_LANGUAGE)
+        except Exception as e:
+            logging.error(f"❌ Transcription impossible de {input_audio_paths[i]} : {e}")
+            results[i] = {"error": str(e)}
+
+    for i in audios:
+        if "error" in results[i]:
+            continue
+        if timelines.get(i) is not None:
+            results[i] = restore_timestamps(results[i], timelines[i])
+        if i in cache_keys:
+            # Les clips courts n'ont qu'un segment approximatif : espace de clés séparé de transcribe_file
+            key = cache_keys[i] if i in long else cache_keys[i] + BATCH_CACHE_SUFFIX
+            transcription_cache.put(key, results[i])
+    return results
+
+def transcribe_audio(audio_id: str, audio_ext: str, model_size: str = WHISPER_MODEL_SIZE) -> str:
+    """Transcrire un fichier audio avec Whisper et sauvegarder le texte."""
+    # Chemins dynamiques
+    input_audio_path = os.path.join(AUDIO_UPLOAD_DIR, f"{audio_id}.{audio_ext}")
+    output_dir = os.path.join(OUTPUT_BASE_DIR, audio_id)
+    os.makedirs(output_dir, exist_ok=True)
+    transcription_output_path = os.path.join(output_dir, "transcription.txt")
+
+    result = transcribe_file(input_audio_path, model_size, os.path.join(output_dir, f"{audio_id}.wav"))
+
+    with open(transcription_output_path, "w", encoding="utf-8") as f:
+        f.write(result["text"])
+
+    logging.info(f"✅ Transcription enregistrée : {transcription_output_path}")
+    return transcription_output_path
+
+def transcribe_stream(audio_id: str, audio_ext: str, model_size: str = WHISPER_MODEL_SIZE,
+                      window_seconds: int = STREAM_WINDOW_SECONDS) -> Iterator[Dict[str, Any]]:
+    """Transcrit l'audio fenêtre par fenêtre et produit chaque segment dès qu'il est prêt."""
+    input_audio_path = os.path.join(AUDIO_UPLOAD_DIR, f"{audio_id}.{audio_ext}")
+    output_dir = os.path.join(OUTPUT_BASE_DIR, audio_id)
+    os.makedirs(output_dir, exist_ok=True)
+    transcription_output_path = os.path.join(output_dir, "transcription.txt")
+
+    if not os.path.isfile(input_audio_path):
+        raise FileNotFoundError(f"❌ Fichier introuvable : {input_audio_path}")
+
+    audio = decode_audio(input_audio_path)
+    backend = get_backend()
+    window = window_seconds * SAMPLE_RATE
+    search = min(int(STREAM_CUT_SEARCH_SECONDS * SAMPLE_RATE), window // 2)
+    texts = []
+
+    start = 0
+    while start < len(audio):
+        end = start + window
+        if end < len(audio):
+            end = quietest_point(audio, end - search, end)
+        offset = start / SAMPLE_RATE
+        # Le texte précédent sert de contexte pour garder la continuité entre les fenêtres
+        prompt = " ".join(texts)[-200:] or None
+        result = backend.transcribe(audio[start:end], model_size, language="fr", initial_prompt=prompt)
+
+        for segment in result.get("segments", []):
+            text = segment["text"].strip()
+            if not text:
+                continue
+            texts.append(text)
+            yield {
+                "start": round(offset + segment["start"], 2),
+                "end": round(offset + segment["end"], 2),
+                "text": text,
+            }
+        start = end
+
+    with open(transcription_output_path, "w", encoding="utf-8") as f:
+        f.write(" ".join(texts))
+    logging.info(f"✅ Transcription enregistrée : {transcription_output_path}")
 
 def main():
     if len(sys.argv) != 3:
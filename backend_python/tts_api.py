@@ -1,8 +1,17 @@
 import os
+import re
+import time
 import logging
+import unicodedata
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from text_to_speech import generate_tts_audio
+from text_to_speech import generate_tts_audio, stream_tts_audio
+from tts_engine import get_engine, get_pool, pool_ready, TTS_WORKERS
+from disk_cache import DiskLRUCache, hash_text
+import metrics
+from config import TTS_MODEL_NAME, TTS_SPEAKER
 
 # Configuration des logs
 logging.basicConfig(
@@ -11,25 +20,86 @@ logging.basicConfig(
 )
 
 app = FastAPI()
+metrics.install(app, "tts")
+
+# Cache des fichiers audio générés, adressé par le contenu
+TTS_OUTPUT_DIR = "static/output/tts"
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+tts_cache = DiskLRUCache(TTS_OUTPUT_DIR, TTS_CACHE_MAX_BYTES, suffix=".mp3", name="tts")
+
+@app.on_event("startup")
+async def preload_tts_model():
+    # Le modèle TTS reste chargé pendant toute la durée de vie du service
+    if os.getenv("TTS_PRELOAD", "1") == "1":
+        pool = get_pool()
+        if pool is None:
+            await run_in_threadpool(get_engine().load)
+        else:
+            # Chaque worker charge son propre modèle : la première requête ne paie aucun chargement
+            await run_in_threadpool(pool.warm_up)
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness : le processus répond (aucun modèle n'est chargé ni vérifié)."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness : le modèle TTS est résident (dans chaque worker du pool s'il y en a un), sans chargement."""
+    ready = pool_ready() if TTS_WORKERS > 0 else get_engine().loaded
+    if not ready:
+        raise HTTPException(status_code=503, detail={"status": "loading"})
+    return {"status": "ready"}
 
 class TextToSpeechRequest(BaseModel):
     text: str
 
+def normalize_text(text: str) -> str:
+    """Forme canonique du texte pour la clé de cache (Unicode NFC, espaces normalisés)."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+def tts_cache_key(text: str) -> str:
+    # Digest stable entre processus et redémarrages (contrairement à hash())
+    return hash_text(normalize_text(text), TTS_MODEL_NAME, TTS_SPEAKER)
+
 @app.post("/tts")
 async def text_to_speech(request: TextToSpeechRequest):
     try:
-        # Créer le répertoire de sortie s'il n'existe pas
-        output_dir = "static/output/tts"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Générer un nom de fichier unique
-        output_path = os.path.join(output_dir, f"tts_output_{hash(request.text)}.wav")
-        
-        # Générer l'audio
-        audio_path = generate_tts_audio(request.text, output_path)
-        
+        key = tts_cache_key(request.text)
+        cached_path = tts_cache.get_path(key)
+        if cached_path is not None:
+            logging.info(f"♻️ Audio trouvé dans le cache : {cached_path}")
+            return {"audio_path": str(cached_path)}
+
+        # Générer l'audio directement à son emplacement dans le cache
+        output_path = str(tts_cache.reserve_path(key))
+        audio_path = await run_in_threadpool(generate_tts_audio, request.text, output_path)
+        await run_in_threadpool(tts_cache.evict)
+
         return {"audio_path": audio_path}
         
     except Exception as e:
         logging.error(f"Erreur lors de la génération de l'audio: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@app.post("/tts/stream")
+def text_to_speech_stream(request: TextToSpeechRequest):
+    """Synthèse en streaming : l'audio MP3 est envoyé phrase par phrase (réponse chunked)."""
+    started = time.perf_counter()
+
+    def audio_chunks():
+        first = True
+        try:
+            for chunk in stream_tts_audio(request.text):
+                if first:
+                    ttfb = time.perf_counter() - started
+                    metrics.TTS_TTFB_SECONDS.observe(ttfb)
+                    logging.info(f"⏱️ Premier morceau audio envoyé en {ttfb:.2f}s")
+                    first = False
+                yield chunk
+        except Exception as e:
+            # Les en-têtes sont déjà partis : on ne peut qu'interrompre le flux
+            logging.error(f"Erreur lors de la génération de l'audio en streaming: {str(e)}")
+            raise
+
+    return StreamingResponse(audio_chunks(), media_type="audio/mpeg")
@@ -0,0 +1,249 @@
+import os
+import math
+import time
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator, Optional
+import ffmpeg
+import numpy as np
+from config import TTS_MODEL_NAME, TTS_SPEAKER
+from metrics import span, MODEL_LOAD_SECONDS
+
+# Paramètres d'encodage MP3
+MP3_BITRATE = "192k"
+# Silence inséré entre deux morceaux synthétisés (secondes)
+CHUNK_PAUSE_SECONDS = 0.15
+# Pool de processus TTS (0 = synthèse dans le processus courant)
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "0"))
+TTS_TORCH_THREADS = int(os.getenv("TTS_TORCH_THREADS", "2"))
+
+# Logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+class TTSEngine:
+    """Modèle TTS chargé une seule fois et synthèse entièrement en mémoire."""
+
+    def __init__(self, model_name: str = TTS_MODEL_NAME, device: str = "cpu"):
+        self.model_name = model_name
+        self.device = device
+        self._tts = None
+        self._load_lock = threading.Lock()
+        # Le synthétiseur n'est pas thread-safe : une synthèse à la fois par modèle
+        self._synth_lock = threading.Lock()
+        self.speaker: Optional[str] = None
+        self.language: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._tts is not None
+
+    def load(self):
+        with self._load_lock:
+            if self._tts is None:
+                from TTS.api import TTS
+
+                logging.info(f"🧠 Chargement du modèle TTS ({self.model_name})...")
+                start = time.perf_counter()
+                tts = TTS(model_name=self.model_name, progress_bar=False).to(self.device)
+                MODEL_LOAD_SECONDS.observe(time.perf_counter() - start, model="tts")
+                # Sélection d'un locuteur et d'une langue seulement si le modèle en propose
+                if tts.is_multi_speaker:
+                    self.speaker = TTS_SPEAKER if TTS_SPEAKER in tts.speakers else tts.speakers[0]
+                if tts.is_multi_lingual:
+                    self.language = "fr" if "fr" in tts.languages else tts.languages[0]
+                self._tts = tts
+        return self._tts
+
+    @property
+    def sample_rate(self) -> int:
+        return self.load().synthesizer.output_sample_rate
+
+    def synthesize(self, text: str) -> np.ndarray:
+        """Synthétise un morceau de texte en échantillons float32 (aucun fichier écrit)."""
+        tts = self.load()
+        with self._synth_lock, span("tts_synthesis", chars=len(text)):
+            wav = tts.tts(text=text, speaker=self.speaker, language=self.language)
+        return np.asarray(wav, dtype=np.float32)
+
+    def synthesize_chunks(self, chunks: list[str]) -> np.ndarray:
+        """Synthétise plusieurs morceaux et les concatène avec une courte pause."""
+        parts = []
+        for i, chunk in enumerate(chunks):
+            logging.info(f"🎙️ Synthèse vocale du morceau {i + 1}/{len(chunks)}...")
+            parts.append(self.synthesize(chunk))
+        return join_chunks(parts, self.sample_rate)
+
+def join_chunks(parts: list[np.ndarray], sample_rate: int) -> np.ndarray:
+    """Concatène les morceaux dans l'ordre, séparés par une courte pause."""
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+    with span("concat", parts=len(parts)):
+        pause = np.zeros(int(CHUNK_PAUSE_SECONDS * sample_rate), dtype=np.float32)
+        joined = [parts[0]]
+        for part in parts[1:]:
+            joined.extend((pause, part))
+        return np.concatenate(joined)
+
+# Moteur propre à chaque worker du pool
+_worker_engine: Optional["TTSEngine"] = None
+
+def _init_worker(torch_threads: int):
+    global _worker_engine
+    import torch
+    torch.set_num_threads(torch_threads)
+    _worker_engine = TTSEngine()
+    _worker_engine.load()
+
+def _synthesize_in_worker(text: str) -> tuple[np.ndarray, int]:
+    return _worker_engine.synthesize(text), _worker_engine.sample_rate
+
+def _wait_for_all_workers(barrier) -> int:
+    # Chaque tâche bloque jusqu'à ce que tous les workers en exécutent une : aucun n'est oublié
+    barrier.wait()
+    return os.getpid()
+
+class TTSWorkerPool:
+    """Pool de processus TTS, chacun avec son modèle VITS résident, partagé équitablement entre requêtes."""
+
+    def __init__(self, workers: int = TTS_WORKERS, torch_threads: int = TTS_TORCH_THREADS):
+        self.workers = max(1, workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(torch_threads,),
+        )
+        self._active = 0
+        self._lock = threading.Lock()
+        self._warm_up_lock = threading.Lock()
+        self.ready = False
+        logging.info(f"⚙️ Pool TTS : {self.workers} workers ({torch_threads} threads torch chacun)")
+
+    def warm_up(self):
+        """Démarre tous les workers et attend que chacun ait chargé son modèle (une seule fois)."""
+        # Deux barrières simultanées pourraient se partager les workers et bloquer indéfiniment
+        with self._warm_up_lock:
+            if self.ready:
+                return
+            start = time.perf_counter()
+            with multiprocessing.get_context("spawn").Manager() as manager:
+                barrier = manager.Barrier(self.workers)
+                futures = [self._executor.submit(_wait_for_all_workers, barrier) for _ in range(self.workers)]
+                pids = {future.result() for future in futures}
+            self.ready = True
+        logging.info(f"✅ Pool TTS prêt : {len(pids)} workers initialisés en {time.perf_counter() - start:.2f}s")
+
+    def _fair_share(self) -> int:
+        # Chaque requête active garde au plus sa part des workers en vol
+        with self._lock:
+            return max(1, math.ceil(self.workers / max(1, self._active)))
+
+    def synthesize_chunks(self, chunks: list[str]) -> tuple[np.ndarray, int]:
+        """Répartit les morceaux sur les workers et les réassemble dans l'ordre."""
+        with self._lock:
+            self._active += 1
+        try:
+            results: dict[int, np.ndarray] = {}
+            sample_rate = 0
+            pending = {}
+            next_index = 0
+            while next_index < len(chunks) or pending:
+                while next_index < len(chunks) and len(pending) < self._fair_share():
+                    future = self._executor.submit(_synthesize_in_worker, chunks[next_index])
+                    pending[future] = next_index
+                    next_index += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    results[index], sample_rate = future.result()
+            return join_chunks([results[i] for i in range(len(chunks))], sample_rate), sample_rate
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def synthesize_stream(self, chunks: list[str]) -> Iterator[tuple[np.ndarray, int]]:
+        """Produit chaque morceau synthétisé dans l'ordre, les suivants étant calculés en avance."""
+        with self._lock:
+            self._active += 1
+        pending = deque()
+        try:
+            next_index = 0
+            while next_index < len(chunks) or pending:
+                while next_index < len(chunks) and len(pending) < self._fair_share():
+                    pending.append(self._executor.submit(_synthesize_in_worker, chunks[next_index]))
+                    next_index += 1
+                yield pending.popleft().result()
+        finally:
+            # Client déconnecté : les morceaux pas encore commencés sont abandonnés
+            for future in pending:
+                future.cancel()
+            with self._lock:
+                self._active -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(cancel_futures=True)
+
+def encode_mp3_bytes(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Encode des échantillons float32 en MP3 via ffmpeg (entrée et sortie par pipe)."""
+    with span("mp3_encode"):
+        out, _ = (
+            ffmpeg.input("pipe:", format="f32le", ar=sample_rate, ac=1)
+            .output("pipe:", format="mp3", acodec="libmp3lame", audio_bitrate=MP3_BITRATE)
+            .run(input=samples.astype(np.float32).tobytes(), capture_stdout=True, capture_stderr=True)
+        )
+    return out
+
+def write_mp3(samples: np.ndarray, sample_rate: int, output_path: str):
+    """Écrit le MP3 de façon atomique : deux traitements concurrents ne partagent aucun fichier temporaire."""
+    data = encode_mp3_bytes(samples, sample_rate)
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, output_path)
+
+# Moteur partagé par tout le processus
+_engine: Optional[TTSEngine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> TTSEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = TTSEngine()
+        return _engine
+
+def set_engine(engine: TTSEngine):
+    """Remplace le moteur partagé (moteur de substitution pour les benchmarks hors ligne)."""
+    global _engine
+    with _engine_lock:
+        _engine = engine
+
+_pool: Optional[TTSWorkerPool] = None
+
+def pool_ready() -> bool:
+    """Vrai quand tous les workers du pool ont chargé leur modèle (ne crée jamais le pool)."""
+    return _pool is not None and _pool.ready
+
+def get_pool() -> Optional[TTSWorkerPool]:
+    """Pool de workers TTS partagé, ou None si TTS_WORKERS vaut 0."""
+    global _pool
+    if TTS_WORKERS <= 0:
+        return None
+    with _engine_lock:
+        if _pool is None:
+            _pool = TTSWorkerPool()
+            # Sans préchargement, le pool est créé par la première requête : pool_ready() doit tout de même passer à True
+            threading.Thread(target=_warm_up_pool, args=(_pool,), name="tts-warm-up", daemon=True).start()
+        return _pool
+
+def _warm_up_pool(pool: TTSWorkerPool):
+    try:
+        pool.warm_up()
+    except Exception as e:
+        logging.error(f"❌ Initialisation du pool TTS impossible : {e}")
@@ -0,0 +1,69 @@
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+from typing import AsyncIterator, Tuple
+from transcription import AUDIO_UPLOAD_DIR
+
+# Réception des fichiers audio : le corps de la requête est écrit sur disque au fil de l'eau,
+# la mémoire utilisée reste celle d'un bloc quelle que soit la taille du fichier.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+# Longueur de l'identifiant dérivé du SHA-256 (même longueur qu'un UUID sans tirets)
+AUDIO_ID_LENGTH = 32
+# Les blocs reçus sont regroupés avant chaque écriture, faite hors de la boucle d'événements
+WRITE_BLOCK_SIZE = 1024 * 1024
+
+# Logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+class UploadTooLargeError(ValueError):
+    """Le fichier envoyé dépasse MAX_UPLOAD_BYTES."""
+
+async def save_upload(chunks: AsyncIterator[bytes], audio_ext: str, max_bytes: int = MAX_UPLOAD_BYTES,
+                      directory: str = AUDIO_UPLOAD_DIR) -> Tuple[str, bool]:
+    """Enregistre un flux audio sous un identifiant dérivé de son contenu.
+
+    Retourne (audio_id, deduplicated) ; deduplicated vaut True si le même fichier
+    avait déjà été reçu. Lève UploadTooLargeError dès que max_bytes est dépassé.
+    """
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    received = 0
+
+    # Fichier temporaire dans le dossier cible : le renommage final reste atomique
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            buffer = bytearray()
+            async for chunk in chunks:
+                received += len(chunk)
+                if received > max_bytes:
+                    raise UploadTooLargeError(f"File too large (max {max_bytes} bytes)")
+                digest.update(chunk)
+                buffer += chunk
+                if len(buffer) >= WRITE_BLOCK_SIZE:
+                    await asyncio.to_thread(f.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(f.write, bytes(buffer))
+        if received == 0:
+            raise ValueError("Empty file")
+
+        audio_id = digest.hexdigest()[:AUDIO_ID_LENGTH]
+        final_path = os.path.join(directory, f"{audio_id}.{audio_ext}")
+        if os.path.isfile(final_path):
+            os.remove(temp_path)
+            logging.info(f"♻️ Fichier déjà reçu : {final_path}")
+            return audio_id, True
+
+        os.replace(temp_path, final_path)
+        logging.info(f"📥 Fichier reçu : {final_path} ({received / 1024 / 1024:.1f} Mo)")
+        return audio_id, False
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise